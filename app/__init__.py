@@ -11,7 +11,10 @@ from core.managers.module_manager import ModuleManager
 from core.managers.config_manager import ConfigManager
 from core.managers.error_handler_manager import ErrorHandlerManager
 from core.managers.logging_manager import LoggingManager
+from core.serialisers.json_provider import OrjsonProvider
 from core.apprise.apprise import AppriseExtension
+from core.archives.archive_cache import ArchiveCache
+from core.tracking.event_tracker import EventTracker
 
 # Load environment variables
 load_dotenv()
@@ -20,10 +23,13 @@ load_dotenv()
 db = SQLAlchemy()
 migrate = Migrate()
 apprise = AppriseExtension()
+archive_cache = ArchiveCache()
+tracker = EventTracker()
 
 
 def create_app(config_name='development'):
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
 
     # Load configuration according to environment
     config_manager = ConfigManager(app)
@@ -33,6 +39,8 @@ def create_app(config_name='development'):
     db.init_app(app)
     migrate.init_app(app, db)
     apprise.init_app(app)
+    archive_cache.init_app(app)
+    tracker.init_app(app, db)
 
     # Register modules
     module_manager = ModuleManager(app)
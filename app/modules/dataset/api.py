@@ -1,5 +1,6 @@
 from app.modules.dataset.models import DataSet
-from core.resources.generic_resource import create_resource
+from app.modules.dataset.repositories import dataset_graph_options
+from core.resources.generic_resource import create_resource, output_json
 from core.serialisers.serializer import Serializer
 
 file_fields = {'file_id': 'id', 'file_name': 'name', 'size': 'get_formatted_size'}
@@ -15,10 +16,11 @@ dataset_fields = {
 
 dataset_serializer = Serializer(dataset_fields, related_serializers={'files': file_serializer})
 
-DataSetResource = create_resource(DataSet, dataset_serializer)
+DataSetResource = create_resource(DataSet, dataset_serializer, dataset_graph_options)
 
 
 def init_blueprint_api(api):
     """Function to register resources with the provided Flask-RESTful Api instance."""
+    api.representation('application/json')(output_json)
     api.add_resource(DataSetResource, '/api/v1/datasets/', endpoint='datasets')
     api.add_resource(DataSetResource, '/api/v1/datasets/<int:id>', endpoint='dataset')
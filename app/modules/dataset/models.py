@@ -1,11 +1,18 @@
 from datetime import datetime
 from enum import Enum
+from typing import List
 
 from flask import request
 from sqlalchemy.schema import UniqueConstraint
-from sqlalchemy import Enum as SQLAlchemyEnum
+from sqlalchemy import Enum as SQLAlchemyEnum, event, inspect
 
 from app import db
+from core.repositories.BaseRepository import BaseRepository
+
+MAX_TAG_LENGTH = 120
+TAG_NAME_TYPE = db.String(MAX_TAG_LENGTH).with_variant(
+    db.String(MAX_TAG_LENGTH, collation='utf8mb4_bin'), 'mysql', 'mariadb'
+)
 
 
 # Modelo de publicación (sin cambios)
@@ -72,6 +79,9 @@ class DataSet(db.Model):
 
     ds_meta_data_id = db.Column(db.Integer, db.ForeignKey('ds_meta_data.id'), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Kept current by the file listeners in hubfile.models
+    file_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+    total_size = db.Column(db.BigInteger, nullable=False, default=0, server_default='0', index=True)
 
     # Relationships
     ds_meta_data = db.relationship('DSMetaData', backref=db.backref('data_set', uselist=False))
@@ -79,12 +89,16 @@ class DataSet(db.Model):
     ratings = db.relationship('Rating', back_populates='dataset', cascade="all, delete-orphan")
 
     def get_uvlhub_doi(self):
-        from app.modules.dataset.services import DataSetService
+        # Listings call this once per dataset, so skip building a DataSetService and its repositories
+        from app.modules.dataset.services import uvlhub_doi_url
+
+        return uvlhub_doi_url(self)
 
-        return DataSetService().get_uvlhub_doi(self)
+    def files(self):
+        return [file for fm in self.feature_models for file in fm.files]
 
     def get_files_count(self):
-        return sum(len(fm.files) for fm in self.feature_models)
+        return self.file_count
 
     def get_file_total_size_for_human(self):
         from app.modules.dataset.services import SizeService
@@ -93,7 +107,7 @@ class DataSet(db.Model):
 
     def get_file_total_size(self):
         """Calcula el tamaño total de todos los archivos asociados al dataset."""
-        return sum(file.size for fm in self.feature_models for file in fm.files)
+        return self.total_size
 
     def get_cleaned_publication_type(self):
         return self.ds_meta_data.publication_type.name.replace('_', ' ').title()
@@ -145,6 +159,28 @@ class DSMetrics(db.Model):
         return f'DSMetrics<models={self.number_of_models}, features={self.number_of_features}>'
 
 
+def parse_tags(tags: str) -> List[str]:
+    """Distinct normalized tag names of a comma separated tags string, in order."""
+    names = (name.strip().lower()[:MAX_TAG_LENGTH] for name in (tags or '').split(','))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+class Tag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    # Binary on MariaDB, whose default collation would make 'cafe' and 'café' the same tag
+    name = db.Column(TAG_NAME_TYPE, nullable=False, unique=True)
+
+    def __repr__(self):
+        return f'Tag<{self.name}>'
+
+
+ds_meta_data_tag = db.Table(
+    'ds_meta_data_tag',
+    db.Column('ds_meta_data_id', db.Integer, db.ForeignKey('ds_meta_data.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True, index=True),
+)
+
+
 class DSMetaData(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     deposition_id = db.Column(db.Integer)
@@ -157,6 +193,8 @@ class DSMetaData(db.Model):
     ds_metrics_id = db.Column(db.Integer, db.ForeignKey('ds_metrics.id'))
     ds_metrics = db.relationship('DSMetrics', uselist=False, backref='ds_meta_data', cascade="all, delete")
     authors = db.relationship('Author', backref='ds_meta_data', lazy=True, cascade="all, delete")
+    # Normalized copy of tags, kept in sync by link_tags
+    tag_list = db.relationship('Tag', secondary=ds_meta_data_tag, lazy=True)
 
     def files(self):
         return [file for fm in self.feature_models for file in fm.files]
@@ -191,9 +229,10 @@ class DSMetaData(db.Model):
         return SizeService().get_human_readable_size(self.get_file_total_size())
 
     def get_uvlhub_doi(self):
-        from app.modules.dataset.services import DataSetService
+        # Listings call this once per dataset, so skip building a DataSetService and its repositories
+        from app.modules.dataset.services import uvlhub_doi_url
 
-        return DataSetService().get_uvlhub_doi(self)
+        return uvlhub_doi_url(self)
 
     def to_dict(self):
         return {
@@ -225,8 +264,15 @@ class DSDownloadRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     dataset_id = db.Column(db.Integer, db.ForeignKey('data_set.id'))
-    download_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    download_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
     download_cookie = db.Column(db.String(36), nullable=False)  # Assuming UUID4 strings
+    # NULLs never collide in a unique index, so anonymous records are keyed on user 0
+    user_key = db.Column(db.Integer, db.Computed('coalesce(user_id, 0)', persisted=True))
+
+    __table_args__ = (
+        UniqueConstraint('user_key', 'dataset_id', 'download_cookie', name='uix_ds_download_once'),
+        db.Index('ix_ds_download_record_dataset_date', 'dataset_id', 'download_date'),
+    )
 
     def __repr__(self):
         return (
@@ -241,8 +287,14 @@ class DSViewRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     dataset_id = db.Column(db.Integer, db.ForeignKey('data_set.id'))
-    view_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    view_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
     view_cookie = db.Column(db.String(36), nullable=False)  # Assuming UUID4 strings
+    user_key = db.Column(db.Integer, db.Computed('coalesce(user_id, 0)', persisted=True))
+
+    __table_args__ = (
+        UniqueConstraint('user_key', 'dataset_id', 'view_cookie', name='uix_ds_view_once'),
+        db.Index('ix_ds_view_record_dataset_date', 'dataset_id', 'view_date'),
+    )
 
     def __repr__(self):
         return f'<View id={self.id} dataset_id={self.dataset_id} date={self.view_date} cookie={self.view_cookie}>'
@@ -252,3 +304,25 @@ class DOIMapping(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     dataset_doi_old = db.Column(db.String(120))
     dataset_doi_new = db.Column(db.String(120))
+
+
+@event.listens_for(db.session, 'before_flush')
+def link_tags(session, flush_context, instances):
+    """Points the tag_list of dataset and feature model metadata at the Tag rows of their tags string."""
+    changed = [
+        instance
+        for instance in (*session.new, *session.dirty)
+        if hasattr(instance, 'tag_list') and inspect(instance).attrs.tags.history.has_changes()
+    ]
+    names = {instance: parse_tags(instance.tags) for instance in changed}
+    all_names = set().union(*names.values())
+    if not all_names:
+        for instance in changed:
+            instance.tag_list = []
+        return
+
+    # Concurrent uploads may create the same tag, so existing names are skipped rather than clashing
+    BaseRepository(Tag).record_many_once([{'name': name} for name in sorted(all_names)], commit=False)
+    tags = {tag.name: tag for tag in session.query(Tag).filter(Tag.name.in_(all_names))}
+    for instance in changed:
+        instance.tag_list = [tags[name] for name in names[instance]]
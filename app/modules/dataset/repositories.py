@@ -4,13 +4,31 @@ from flask_login import current_user
 from typing import Optional
 
 from sqlalchemy import desc, func
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
 
 from app.modules.dataset.models import Author, DOIMapping, DSDownloadRecord, DSMetaData, DSViewRecord, DataSet
+from app.modules.featuremodel.models import FeatureModel
+from app.modules.hubfile.models import Hubfile
 from core.repositories.BaseRepository import BaseRepository
 
 logger = logging.getLogger(__name__)
 
 
+def dataset_graph_options(ds_meta_data_loader=joinedload):
+    """
+    Loader options fetching datasets with everything their listings and to_dict touch (metadata,
+    authors, feature models, files and ratings) in a fixed number of queries, whatever the number
+    of datasets. Pass contains_eager when the query already joins ds_meta_data.
+    """
+    feature_models = selectinload(DataSet.feature_models)
+    return (
+        ds_meta_data_loader(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+        feature_models.selectinload(FeatureModel.files),
+        feature_models.joinedload(FeatureModel.fm_meta_data),
+        selectinload(DataSet.ratings),
+    )
+
+
 class AuthorRepository(BaseRepository):
     def __init__(self):
         super().__init__(Author)
@@ -70,6 +88,7 @@ class DataSetRepository(BaseRepository):
     def get_synchronized(self, current_user_id: int) -> DataSet:
         return (
             self.model.query.join(DSMetaData)
+            .options(*dataset_graph_options(contains_eager))
             .filter(DataSet.user_id == current_user_id, DSMetaData.dataset_doi.isnot(None))
             .order_by(self.model.created_at.desc())
             .all()
@@ -78,6 +97,7 @@ class DataSetRepository(BaseRepository):
     def get_unsynchronized(self, current_user_id: int) -> DataSet:
         return (
             self.model.query.join(DSMetaData)
+            .options(*dataset_graph_options(contains_eager))
             .filter(DataSet.user_id == current_user_id, DSMetaData.dataset_doi.is_(None))
             .order_by(self.model.created_at.desc())
             .all()
@@ -90,15 +110,35 @@ class DataSetRepository(BaseRepository):
             .first()
         )
 
+    def paginate_by_user(self, user_id: int, page: int, per_page: int):
+        return (
+            self.model.query.filter(DataSet.user_id == user_id)
+            .options(*dataset_graph_options())
+            .order_by(self.model.created_at.desc())
+            .paginate(page=page, per_page=per_page, error_out=False)
+        )
+
     def count_synchronized_datasets(self):
         return self.model.query.join(DSMetaData).filter(DSMetaData.dataset_doi.isnot(None)).count()
 
     def count_unsynchronized_datasets(self):
         return self.model.query.join(DSMetaData).filter(DSMetaData.dataset_doi.is_(None)).count()
 
+    def get_synchronized_files(self):
+        """(dataset_id, user_id, file name, checksum) of every file of every synchronized dataset, in one query."""
+        return (
+            self.session.query(self.model.id, self.model.user_id, Hubfile.name, Hubfile.checksum)
+            .join(DSMetaData)
+            .join(FeatureModel, FeatureModel.data_set_id == self.model.id)
+            .join(Hubfile, Hubfile.feature_model_id == FeatureModel.id)
+            .filter(DSMetaData.dataset_doi.isnot(None))
+            .all()
+        )
+
     def latest_synchronized(self):
         return (
             self.model.query.join(DSMetaData)
+            .options(*dataset_graph_options(contains_eager))
             .filter(DSMetaData.dataset_doi.isnot(None))
             .order_by(desc(self.model.id))
             .limit(5)
@@ -2,18 +2,15 @@ import json
 import logging
 import os
 import shutil
-import tempfile
 import uuid
 from datetime import datetime, timezone
-from zipfile import ZipFile
 
 from flask import (
+    Response,
     redirect,
     render_template,
     request,
-    send_file,
     jsonify,
-    send_from_directory,
     make_response,
     abort,
     url_for,
@@ -21,7 +18,7 @@ from flask import (
 )
 from flask_login import login_required, current_user
 
-from app import db
+from app import db, tracker
 from app.modules.auth.services import AuthenticationService
 from app.modules.bot.services import BotMessagingService
 from app.modules.dataset import dataset_bp
@@ -31,14 +28,16 @@ from app.modules.dataset.models import DataSet
 from app.modules.dataset.models import DSDownloadRecord
 from app.modules.dataset.services import (
     AuthorService,
-    DSDownloadRecordService,
     DSMetaDataService,
     DSViewRecordService,
     DataSetService,
     DOIMappingService,
     RatingService,
+    checksum_sidecar_path,
+    save_with_checksums,
 )
 from app.modules.fakenodo.services import FakenodoService
+from core.responses.file_responses import send_file
 
 logger = logging.getLogger(__name__)
 
@@ -102,6 +101,7 @@ def create_dataset():
                 # update DOI
                 deposition_doi = zenodo_service.get_doi(deposition_id)
                 dataset_service.update_dsmetadata(dataset.ds_meta_data_id, dataset_doi=deposition_doi)
+                dataset_service.schedule_bulk_archive_refresh()
             except Exception as e:
                 msg = f"it has not been possible upload feature models in Zenodo and update the DOI: {e}"
                 return jsonify({"message": msg}), 200
@@ -154,7 +154,7 @@ def upload():
         new_filename = file.filename
 
     try:
-        file.save(file_path)
+        save_with_checksums(file.stream, file_path)
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
@@ -178,6 +178,9 @@ def delete():
 
     if os.path.exists(filepath):
         os.remove(filepath)
+        sidecar_path = checksum_sidecar_path(filepath)
+        if os.path.exists(sidecar_path):
+            os.remove(sidecar_path)
         return jsonify({"message": "File deleted successfully"})
 
     return jsonify({"error": "Error: File not found"})
@@ -190,59 +193,32 @@ def download_dataset(dataset_id):
 
     dataset = dataset_service.get_or_404(dataset_id)
 
-    file_path = f"uploads/user_{dataset.user_id}/dataset_{dataset.id}/"
-
-    temp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(temp_dir, f"dataset_{dataset_id}.zip")
-
-    with ZipFile(zip_path, "w") as zipf:
-        for subdir, dirs, files in os.walk(file_path):
-            for file in files:
-                full_path = os.path.join(subdir, file)
-
-                relative_path = os.path.relpath(full_path, file_path)
-
-                zipf.write(
-                    full_path,
-                    arcname=os.path.join(os.path.basename(zip_path[:-4]), relative_path),
-                )
+    cached_archive = dataset_service.get_cached_archive(dataset)
+    if cached_archive:
+        resp = send_file(
+            cached_archive,
+            as_attachment=True,
+            download_name=f"dataset_{dataset_id}.zip",
+            mimetype="application/zip",
+        )
+    else:
+        resp = Response(dataset_service.zip_dataset(dataset), mimetype="application/zip")
+        resp.headers["Content-Disposition"] = f"attachment; filename=dataset_{dataset_id}.zip"
 
     user_cookie = request.cookies.get("download_cookie")
     if not user_cookie:
         user_cookie = str(uuid.uuid4())  # Generate a new unique identifier if it does not exist
         # Save the cookie to the user's browser
-        resp = make_response(
-            send_from_directory(
-                temp_dir,
-                f"dataset_{dataset_id}.zip",
-                as_attachment=True,
-                mimetype="application/zip",
-            )
-        )
         resp.set_cookie("download_cookie", user_cookie)
-    else:
-        resp = send_from_directory(
-            temp_dir,
-            f"dataset_{dataset_id}.zip",
-            as_attachment=True,
-            mimetype="application/zip",
-        )
 
-    # Check if the download record already exists for this cookie
-    existing_record = DSDownloadRecord.query.filter_by(
+    # Record the download unless this cookie already did
+    tracker.track(
+        DSDownloadRecord,
         user_id=current_user.id if current_user.is_authenticated else None,
         dataset_id=dataset_id,
+        download_date=datetime.now(timezone.utc),
         download_cookie=user_cookie,
-    ).first()
-
-    if not existing_record:
-        # Record the download in your database
-        DSDownloadRecordService().create(
-            user_id=current_user.id if current_user.is_authenticated else None,
-            dataset_id=dataset_id,
-            download_date=datetime.now(timezone.utc),
-            download_cookie=user_cookie,
-        )
+    )
 
     BotMessagingService().on_download_dataset(dataset, profile)
 
@@ -251,7 +227,11 @@ def download_dataset(dataset_id):
 
 @dataset_bp.route("/dataset/download/all", methods=["GET"])
 def download_all_dataset():
-    zip_path = dataset_service.zip_all_datasets()
+    zip_path = dataset_service.get_bulk_archive()
+    if zip_path is None:
+        # The first snapshot is still being built; it is refreshed on publish and by 'rosemary dataset:bulk-archive'
+        dataset_service.schedule_bulk_archive_refresh()
+        abort(503)
     # Obtener la fecha actual en el formato deseado (por ejemplo, YYYYMMDD)
     current_date = datetime.now().strftime("%Y_%m_%d")
     # Crear el nombre del archivo con la fecha
@@ -1,15 +1,18 @@
+from datetime import datetime, timezone
+import json
 import logging
 import os
 import hashlib
 import shutil
-import tempfile
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
 import uuid
-from zipfile import ZipFile
 
-from flask import request
+from flask import current_app, request
+from flask_login import current_user
 
 from sqlalchemy.exc import IntegrityError
+from app import archive_cache, tracker
 from app.modules.auth.services import AuthenticationService
 from app.modules.dataset.models import DSViewRecord, DataSet, DSMetaData, Rating
 from app.modules.dataset.repositories import (
@@ -20,23 +23,99 @@ from app.modules.dataset.repositories import (
     DSViewRecordRepository,
     DataSetRepository,
 )
+from app.modules.explore.services import (
+    SearchIndexService,
+    SuggestionService,
+    UVLContentService,
+    bump_catalog_version,
+)
 from app.modules.featuremodel.repositories import FMMetaDataRepository, FeatureModelRepository
 from app.modules.hubfile.repositories import (
     HubfileDownloadRecordRepository,
     HubfileRepository,
     HubfileViewRecordRepository,
 )
+from app.modules.statistics.services import DATASETS, FEATURE_MODELS, StatisticsService
+from core.archives.bulk_archive import IncrementalZipArchive
+from core.archives.zip_stream import stream_zip, walk_files
 from core.services.BaseService import BaseService
 
 logger = logging.getLogger(__name__)
 
+# One refresh of the bulk snapshot at a time, outside of the requests that trigger it
+_bulk_archive_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk-archive")
+
+
+def archive_digest(files) -> str:
+    """Digest of (name, checksum) pairs, independent of their order."""
+    digest = hashlib.sha256()
+    for name, checksum in sorted(files):
+        digest.update(f"{name}:{checksum}\n".encode())
+    return digest.hexdigest()[:32]
+
+
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
 
 def calculate_checksum_and_size(file_path):
-    file_size = os.path.getsize(file_path)
+    hash_md5 = hashlib.md5()
+    file_size = 0
     with open(file_path, "rb") as file:
-        content = file.read()
-        hash_md5 = hashlib.md5(content).hexdigest()
-        return hash_md5, file_size
+        for chunk in iter(lambda: file.read(CHECKSUM_CHUNK_SIZE), b""):
+            hash_md5.update(chunk)
+            file_size += len(chunk)
+    return hash_md5.hexdigest(), file_size
+
+
+def uvlhub_doi_url(dataset: DataSet) -> str:
+    domain = os.getenv('DOMAIN', 'localhost')
+    return f'http://{domain}/doi/{dataset.ds_meta_data.dataset_doi}'
+
+
+def checksum_sidecar_path(file_path: str) -> str:
+    directory, filename = os.path.split(file_path)
+    return os.path.join(directory, f".{filename}.checksum")
+
+
+def save_with_checksums(stream, file_path: str) -> dict:
+    """
+    Writes an uploaded stream to file_path, hashing it on the way, and records the
+    result in a per-file sidecar so dataset creation does not have to read it again.
+    """
+    hash_md5 = hashlib.md5()
+    hash_sha256 = hashlib.sha256()
+    size = 0
+    with open(file_path, "wb") as file:
+        for chunk in iter(lambda: stream.read(CHECKSUM_CHUNK_SIZE), b""):
+            hash_md5.update(chunk)
+            hash_sha256.update(chunk)
+            size += len(chunk)
+            file.write(chunk)
+
+    record = {
+        "md5": hash_md5.hexdigest(),
+        "sha256": hash_sha256.hexdigest(),
+        "size": size,
+        "mtime_ns": os.stat(file_path).st_mtime_ns,
+    }
+    sidecar_path = checksum_sidecar_path(file_path)
+    with open(f"{sidecar_path}.tmp", "w") as sidecar:
+        json.dump(record, sidecar)
+    os.replace(f"{sidecar_path}.tmp", sidecar_path)
+    return record
+
+
+def read_checksums(file_path: str) -> Optional[dict]:
+    """Sidecar record of file_path, or None if it is missing or no longer matches the file."""
+    try:
+        with open(checksum_sidecar_path(file_path)) as sidecar:
+            record = json.load(sidecar)
+        stat = os.stat(file_path)
+    except (OSError, ValueError):
+        return None
+    if record.get("size") != stat.st_size or record.get("mtime_ns") != stat.st_mtime_ns:
+        return None
+    return record
 
 
 class DataSetService(BaseService):
@@ -51,6 +130,10 @@ class DataSetService(BaseService):
         self.hubfilerepository = HubfileRepository()
         self.dsviewrecord_repostory = DSViewRecordRepository()
         self.hubfileviewrecord_repository = HubfileViewRecordRepository()
+        self.statistics_service = StatisticsService()
+        self.search_index_service = SearchIndexService()
+        self.suggestion_service = SuggestionService()
+        self.uvl_content_service = UVLContentService()
 
     def move_feature_models(self, dataset: DataSet):
         current_user = AuthenticationService().get_authenticated_user()
@@ -80,6 +163,9 @@ class DataSetService(BaseService):
     def latest_synchronized(self):
         return self.repository.latest_synchronized()
 
+    def paginate_by_user(self, user_id: int, page: int, per_page: int):
+        return self.repository.paginate_by_user(user_id, page, per_page)
+
     def count_synchronized_datasets(self):
         return self.repository.count_synchronized_datasets()
 
@@ -126,67 +212,107 @@ class DataSetService(BaseService):
 
                 # associated files in feature model
                 file_path = os.path.join(current_user.temp_folder(), uvl_filename)
-                checksum, size = calculate_checksum_and_size(file_path)
+                checksums = read_checksums(file_path)
+                if checksums:
+                    checksum, size = checksums["md5"], checksums["size"]
+                else:
+                    checksum, size = calculate_checksum_and_size(file_path)
 
                 file = self.hubfilerepository.create(
                     commit=False, name=uvl_filename, checksum=checksum, size=size, feature_model_id=fm.id
                 )
                 fm.files.append(file)
+                self.uvl_content_service.extract(checksum, file_path, commit=False)
+            self.statistics_service.increment(FEATURE_MODELS, len(form.feature_models), commit=False)
+            if dsmetadata.dataset_doi is not None:
+                self.statistics_service.increment(DATASETS, commit=False)
+            self.search_index_service.index_dataset(dataset, commit=False)
             self.repository.session.commit()
+            self.suggestion_service.update_dataset(dataset.id)
         except Exception as exc:
             logger.info(f"Exception creating dataset from form...: {exc}")
             self.repository.session.rollback()
             raise exc
         return dataset
 
+    def delete(self, id):
+        bump_catalog_version(commit=False)
+        deleted = super().delete(id)
+        self.suggestion_service.update_dataset(id)
+        return deleted
+
     def update_dsmetadata(self, id, **kwargs):
-        return self.dsmetadata_repository.update(id, **kwargs)
+        if "dataset_doi" in kwargs:
+            ds_meta_data = self.dsmetadata_repository.get_by_id(id)
+            published = kwargs["dataset_doi"] is not None
+            if ds_meta_data and (ds_meta_data.dataset_doi is not None) != published:
+                self.statistics_service.increment(DATASETS, 1 if published else -1, commit=False)
+        ds_meta_data = self.dsmetadata_repository.update(id, **kwargs)
+        if ds_meta_data and ds_meta_data.data_set:
+            self.search_index_service.index_dataset(ds_meta_data.data_set)
+            self.suggestion_service.update_dataset(ds_meta_data.data_set.id)
+        return ds_meta_data
 
     def get_uvlhub_doi(self, dataset: DataSet) -> str:
-        domain = os.getenv('DOMAIN', 'localhost')
-        return f'http://{domain}/doi/{dataset.ds_meta_data.dataset_doi}'
+        return uvlhub_doi_url(dataset)
 
-    def zip_dataset(self, dataset: DataSet) -> str:
+    def get_dataset_folder(self, dataset: DataSet) -> str:
         working_dir = os.getenv('WORKING_DIR', '')
-        file_path = os.path.join(working_dir, "uploads", f"user_{dataset.user_id}", f"dataset_{dataset.id}")
-        temp_dir = tempfile.mkdtemp()
-        zip_path = os.path.join(temp_dir, f"dataset_{dataset.id}.zip")
-
-        with ZipFile(zip_path, "w") as zipf:
-            for subdir, dirs, files in os.walk(file_path):
-                for file in files:
-                    full_path = os.path.join(subdir, file)
-
-                    relative_path = os.path.relpath(full_path, file_path)
-
-                    zipf.write(
-                        full_path,
-                        arcname=os.path.join(os.path.basename(zip_path[:-4]), relative_path),
-                    )
-
-        return temp_dir
-
-    def zip_all_datasets(self) -> str:
-        temp_dir = tempfile.mkdtemp()
-        zip_path = os.path.join(temp_dir, "all_datasets.zip")
-        with ZipFile(zip_path, "w") as zipf:
-            for user_dir in os.listdir("uploads"):
-                user_path = os.path.join("uploads", user_dir)
-                if os.path.isdir(user_path) and user_dir.startswith("user_"):
-                    for dataset_dir in os.listdir(user_path):
-                        dataset_path = os.path.join(user_path, dataset_dir)
-                        if os.path.isdir(dataset_path) and dataset_dir.startswith("dataset_"):
-                            dataset_id = int(dataset_dir.split("_")[1])
-                            if self.is_synchronized(dataset_id):
-                                for subdir, dirs, files in os.walk(dataset_path):
-                                    for file in files:
-                                        full_path = os.path.join(subdir, file)
-                                        relative_path = os.path.relpath(full_path, dataset_path)
-                                        zipf.write(
-                                            full_path,
-                                            arcname=os.path.join(dataset_dir, relative_path),
-                                        )
-        return zip_path
+        return os.path.join(working_dir, "uploads", f"user_{dataset.user_id}", f"dataset_{dataset.id}")
+
+    def get_archive_key(self, dataset: DataSet) -> str:
+        """Content address of the dataset archive: changes whenever any of its files changes."""
+        files = [(file.name, file.checksum) for fm in dataset.feature_models for file in fm.files]
+        return f"dataset_{dataset.id}-{archive_digest(files)}"
+
+    def get_cached_archive(self, dataset: DataSet) -> Optional[str]:
+        return archive_cache.get(self.get_archive_key(dataset))
+
+    def zip_dataset(self, dataset: DataSet) -> Iterator[bytes]:
+        """Streams the dataset folder as a ZIP archive, chunk by chunk, storing it in the archive cache."""
+        file_path = self.get_dataset_folder(dataset)
+        chunks = stream_zip(walk_files(file_path, arcroot=f"dataset_{dataset.id}"))
+        return archive_cache.store(self.get_archive_key(dataset), chunks, group=f"dataset_{dataset.id}-")
+
+    def get_bulk_archive(self) -> Optional[str]:
+        """Path of the last bulk snapshot of every synchronized dataset, None until one has been built."""
+        path = current_app.config["BULK_ARCHIVE_PATH"]
+        return path if os.path.exists(path) else None
+
+    def refresh_bulk_archive(self) -> str:
+        """
+        Brings the bulk snapshot in line with the synchronized datasets and returns its path.
+        Only datasets published or changed since the last build are compressed again.
+        """
+        files_by_dataset = {}
+        for dataset_id, user_id, name, checksum in self.repository.get_synchronized_files():
+            files_by_dataset.setdefault((dataset_id, user_id), []).append((name, checksum))
+
+        working_dir = os.getenv("WORKING_DIR", "")
+        sources = {
+            f"dataset_{dataset_id}": (
+                archive_digest(files),
+                os.path.join(working_dir, "uploads", f"user_{user_id}", f"dataset_{dataset_id}"),
+            )
+            for (dataset_id, user_id), files in files_by_dataset.items()
+        }
+        bulk_archive = IncrementalZipArchive(
+            current_app.config["BULK_ARCHIVE_PATH"], max_workers=current_app.config["ARCHIVE_COMPRESSION_WORKERS"]
+        )
+        return bulk_archive.refresh(sources)
+
+    def schedule_bulk_archive_refresh(self):
+        """Refreshes the bulk snapshot on a background thread, e.g. once a dataset has been published."""
+        app = current_app._get_current_object()
+
+        def refresh():
+            with app.app_context():
+                try:
+                    self.refresh_bulk_archive()
+                except Exception:
+                    logger.exception("Bulk archive refresh failed")
+
+        return _bulk_archive_pool.submit(refresh)
 
 
 class AuthorService(BaseService):
@@ -225,10 +351,13 @@ class DSViewRecordService(BaseService):
         if not user_cookie:
             user_cookie = str(uuid.uuid4())
 
-        existing_record = self.the_record_exists(dataset=dataset, user_cookie=user_cookie)
-
-        if not existing_record:
-            self.create_new_record(dataset=dataset, user_cookie=user_cookie)
+        tracker.track(
+            DSViewRecord,
+            user_id=current_user.id if current_user.is_authenticated else None,
+            dataset_id=dataset.id,
+            view_date=datetime.now(timezone.utc),
+            view_cookie=user_cookie,
+        )
 
         return user_cookie
 
@@ -1,10 +1,41 @@
+import decimal
+import io
+import os
+import zipfile
+
 import pytest
 from unittest.mock import patch, MagicMock
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from datetime import datetime
 from app.modules.dataset.routes import dataset_bp
-from app.modules.dataset.services import RatingService
-from app.modules.dataset.models import Rating
+from app.modules.dataset.services import (
+    DataSetService,
+    RatingService,
+    calculate_checksum_and_size,
+    read_checksums,
+    save_with_checksums,
+)
+from app import db
+from app.modules.auth.models import User
+from app.modules.dataset.models import (
+    DataSet,
+    DSDownloadRecord,
+    DSMetaData,
+    DSViewRecord,
+    PublicationType,
+    Rating,
+    Tag,
+)
+from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from app.modules.hubfile.models import Hubfile
+from core.archives.archive_cache import ArchiveCache
+from core.archives.bulk_archive import IncrementalZipArchive
+from core.archives.zip_stream import stream_zip, walk_files
+from core.archives.zip_writer import CHUNK_SIZE
+from core.repositories.BaseRepository import BaseRepository
+from core.serialisers.json_provider import OrjsonProvider
+from core.tracking.event_tracker import EventTracker
 
 
 @pytest.fixture
@@ -16,11 +47,11 @@ def client():
         yield client
 
 
-@patch('app.modules.dataset.routes.dataset_service.zip_all_datasets')
+@patch('app.modules.dataset.routes.dataset_service.get_bulk_archive')
 @patch('app.modules.dataset.routes.send_file')
-def test_download_all_dataset(mock_send_file, mock_zip_all_datasets, client):
+def test_download_all_dataset(mock_send_file, mock_get_bulk_archive, client):
     # Configurar el mock para que devuelva un valor específico
-    mock_zip_all_datasets.return_value = '/path/to/all_datasets.zip'
+    mock_get_bulk_archive.return_value = '/path/to/all_datasets.zip'
     mock_send_file.return_value = MagicMock()
 
     # Realizar una solicitud GET a la ruta de descarga de todos los datasets
@@ -29,8 +60,8 @@ def test_download_all_dataset(mock_send_file, mock_zip_all_datasets, client):
     # Verificar que la respuesta tiene el código de estado 200
     assert response.status_code == 200
 
-    # Verificar que zip_all_datasets fue llamado una vez
-    mock_zip_all_datasets.assert_called_once()
+    # Verificar que get_bulk_archive fue llamado una vez
+    mock_get_bulk_archive.assert_called_once()
 
     # Verificar que send_file fue llamado con los argumentos correctos
     current_date = datetime.now().strftime("%Y_%m_%d")
@@ -92,5 +123,335 @@ def test_get_average_rating(rating_service, mock_db_session):
     assert average == 4.0
 
 
+@patch('app.modules.dataset.routes.dataset_service.schedule_bulk_archive_refresh')
+@patch('app.modules.dataset.routes.dataset_service.get_bulk_archive', return_value=None)
+def test_download_all_dataset_never_builds_the_snapshot_in_the_request(mock_get_bulk_archive, mock_schedule, client):
+    response = client.get('/dataset/download/all')
+
+    assert response.status_code == 503
+    mock_schedule.assert_called_once()
+
+
+def test_zip_dataset_streams_every_file(client, tmp_path, monkeypatch):
+    """The dataset archive is yielded in chunks and contains every file of the dataset folder."""
+    monkeypatch.setenv('WORKING_DIR', str(tmp_path))
+    monkeypatch.setattr('app.archive_cache.directory', None)
+    dataset_folder = tmp_path / 'uploads' / 'user_1' / 'dataset_7'
+    (dataset_folder / 'glencoe').mkdir(parents=True)
+    (dataset_folder / 'model.uvl').write_text('features\n    Root')
+    (dataset_folder / 'glencoe' / 'model.json').write_text('{}')
+
+    with client.application.app_context():
+        chunks = DataSetService().zip_dataset(MagicMock(id=7, user_id=1))
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+
+    assert archive.testzip() is None
+    assert sorted(archive.namelist()) == ['dataset_7/glencoe/model.json', 'dataset_7/model.uvl']
+    assert archive.read('dataset_7/model.uvl') == b'features\n    Root'
+
+
+def test_stream_zip_never_holds_a_whole_member_in_memory(tmp_path):
+    """Members larger than a chunk are sent as several chunks, none of them bigger than a chunk."""
+    content = os.urandom(3 * CHUNK_SIZE)
+    (tmp_path / 'big.bin').write_bytes(content)
+    (tmp_path / 'módulo.uvl').write_text('features')
+
+    chunks = list(stream_zip(walk_files(str(tmp_path), arcroot='dataset_1')))
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+
+    assert max(len(chunk) for chunk in chunks) <= CHUNK_SIZE + 1024
+    assert archive.testzip() is None
+    assert archive.read('dataset_1/big.bin') == content
+    assert archive.read('dataset_1/módulo.uvl') == b'features'
+
+
+@pytest.fixture
+def archive_cache(tmp_path):
+    cache = ArchiveCache()
+    cache.directory = str(tmp_path / 'archives')
+    cache.max_bytes = 1024
+    return cache
+
+
+def test_archive_cache_serves_stored_archives(archive_cache):
+    assert archive_cache.get('dataset_1-aaa') is None
+
+    chunks = list(archive_cache.store('dataset_1-aaa', iter([b'PK', b'data']), group='dataset_1-'))
+
+    assert chunks == [b'PK', b'data']
+    with open(archive_cache.get('dataset_1-aaa'), 'rb') as archive:
+        assert archive.read() == b'PKdata'
+    assert archive_cache.stats()['hits'] == 1
+    assert archive_cache.stats()['misses'] == 1
+
+
+def test_archive_cache_replaces_stale_versions_of_a_group(archive_cache):
+    list(archive_cache.store('dataset_1-aaa', iter([b'old']), group='dataset_1-'))
+    list(archive_cache.store('dataset_2-ccc', iter([b'other']), group='dataset_2-'))
+    list(archive_cache.store('dataset_11-ddd', iter([b'eleven']), group='dataset_11-'))
+    list(archive_cache.store('dataset_1-bbb', iter([b'new']), group='dataset_1-'))
+
+    assert archive_cache.get('dataset_1-aaa') is None
+    assert archive_cache.get('dataset_1-bbb') is not None
+    assert archive_cache.get('dataset_2-ccc') is not None
+    assert archive_cache.get('dataset_11-ddd') is not None
+
+
+def test_archive_cache_evicts_least_recently_used(archive_cache):
+    list(archive_cache.store('dataset_1-aaa', iter([b'x' * 600])))
+    os.utime(archive_cache.path_for('dataset_1-aaa'), (0, 0))
+    list(archive_cache.store('dataset_2-bbb', iter([b'y' * 600])))
+
+    stats = archive_cache.stats()
+    assert archive_cache.get('dataset_1-aaa') is None
+    assert archive_cache.get('dataset_2-bbb') is not None
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 1
+
+
+def test_archive_cache_hits_refresh_the_eviction_order(archive_cache):
+    list(archive_cache.store('dataset_1-aaa', iter([b'x' * 400])))
+    list(archive_cache.store('dataset_2-bbb', iter([b'y' * 400])))
+    os.utime(archive_cache.path_for('dataset_1-aaa'), (0, 0))
+    os.utime(archive_cache.path_for('dataset_2-bbb'), (1, 1))
+
+    assert archive_cache.get('dataset_1-aaa') is not None
+    list(archive_cache.store('dataset_3-ccc', iter([b'z' * 400])))
+
+    assert archive_cache.get('dataset_2-bbb') is None
+    assert archive_cache.get('dataset_1-aaa') is not None
+    assert archive_cache.get('dataset_3-ccc') is not None
+
+
+def test_archive_cache_discards_interrupted_archives(archive_cache):
+    download = archive_cache.store('dataset_1-aaa', iter([b'PK', b'data']))
+    next(download)
+    download.close()
+
+    assert archive_cache.get('dataset_1-aaa') is None
+    assert archive_cache.stats()['entries'] == 0
+
+
+def test_bulk_archive_only_rebuilds_changed_datasets(tmp_path):
+    for group, content in [('dataset_1', 'features A'), ('dataset_2', 'features B')]:
+        (tmp_path / group).mkdir()
+        (tmp_path / group / 'model.uvl').write_text(content)
+    bulk = IncrementalZipArchive(str(tmp_path / 'bulk' / 'all_datasets.zip'), max_workers=2)
+
+    bulk.refresh({'dataset_1': ('v1', str(tmp_path / 'dataset_1')), 'dataset_2': ('v1', str(tmp_path / 'dataset_2'))})
+
+    # dataset_1 is unchanged, so its entries must come from the previous snapshot, not from disk
+    (tmp_path / 'dataset_1' / 'model.uvl').unlink()
+    (tmp_path / 'dataset_2' / 'model.uvl').write_text('features B2')
+    (tmp_path / 'dataset_3').mkdir()
+    (tmp_path / 'dataset_3' / 'model.uvl').write_text('features C')
+    path = bulk.refresh(
+        {
+            'dataset_1': ('v1', str(tmp_path / 'dataset_1')),
+            'dataset_2': ('v2', str(tmp_path / 'dataset_2')),
+            'dataset_3': ('v1', str(tmp_path / 'dataset_3')),
+        }
+    )
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.testzip() is None
+        assert archive.read('dataset_1/model.uvl') == b'features A'
+        assert archive.read('dataset_2/model.uvl') == b'features B2'
+        assert archive.read('dataset_3/model.uvl') == b'features C'
+    assert bulk.load_manifest() == {'dataset_1': 'v1', 'dataset_2': 'v2', 'dataset_3': 'v1'}
+
+
+def test_upload_checksums_are_computed_while_saving(tmp_path):
+    file_path = str(tmp_path / 'model.uvl')
+    content = b'features\n    Root\n' * 1000
+
+    record = save_with_checksums(io.BytesIO(content), file_path)
+
+    assert open(file_path, 'rb').read() == content
+    assert (record['md5'], record['size']) == calculate_checksum_and_size(file_path)
+    assert len(record['sha256']) == 64
+    assert read_checksums(file_path) == record
+
+
+def test_upload_checksums_are_ignored_once_the_file_changes(tmp_path):
+    file_path = str(tmp_path / 'model.uvl')
+    save_with_checksums(io.BytesIO(b'features'), file_path)
+
+    with open(file_path, 'ab') as f:
+        f.write(b'\n    Root')
+
+    assert read_checksums(file_path) is None
+    assert read_checksums(str(tmp_path / 'missing.uvl')) is None
+
+
+@pytest.fixture
+def tracked_dataset(test_client):
+    ds_meta_data = DSMetaData(title='Tracked', description='Tracked', publication_type=PublicationType.NONE)
+    db.session.add(ds_meta_data)
+    db.session.commit()
+    dataset = DataSet(user_id=User.query.first().id, ds_meta_data_id=ds_meta_data.id)
+    db.session.add(dataset)
+    db.session.commit()
+    return dataset
+
+
+def test_record_once_skips_duplicates_of_anonymous_records(tracked_dataset):
+    repository = BaseRepository(DSViewRecord)
+    record = dict(user_id=None, dataset_id=tracked_dataset.id, view_date=datetime.now(), view_cookie='cookie-1')
+
+    assert repository.record_once(**record)
+    assert not repository.record_once(**record)
+    assert repository.record_once(**dict(record, user_id=tracked_dataset.user_id))
+    assert DSViewRecord.query.filter_by(dataset_id=tracked_dataset.id).count() == 2
+
+
+def test_tracker_batches_records_and_skips_duplicates(test_client, tracked_dataset):
+    app = test_client.application
+    event_tracker = EventTracker(app, db)
+    event_tracker.asynchronous = True
+    event_tracker.flush_interval = 60
+
+    def track(cookie):
+        event_tracker.track(
+            DSDownloadRecord,
+            user_id=None,
+            dataset_id=tracked_dataset.id,
+            download_date=datetime.now(),
+            download_cookie=cookie,
+        )
+
+    for cookie in ('cookie-1', 'cookie-1', 'cookie-2'):
+        track(cookie)
+    assert event_tracker.stats()['queue_depth'] == 3
+    event_tracker.flush()
+
+    track('cookie-2')
+    event_tracker.flush()
+
+    stats = event_tracker.stats()
+    assert stats['queue_depth'] == 0
+    assert (stats['written'], stats['duplicates']) == (2, 2)
+    assert DSDownloadRecord.query.filter_by(dataset_id=tracked_dataset.id).count() == 2
+
+
+def test_tracker_requeues_batches_that_fail(test_client, tracked_dataset, monkeypatch):
+    app = test_client.application
+    event_tracker = EventTracker(app, db)
+    event_tracker.asynchronous = True
+    event_tracker.flush_interval = 60
+    event_tracker.track(
+        DSDownloadRecord,
+        user_id=None,
+        dataset_id=tracked_dataset.id,
+        download_date=datetime.now(),
+        download_cookie='retried',
+    )
+    write = event_tracker._write
+
+    def deadlock(events):
+        raise RuntimeError('Deadlock found when trying to get lock')
+
+    monkeypatch.setattr(event_tracker, '_write', deadlock)
+    event_tracker.flush()
+    assert event_tracker.stats()['queue_depth'] == 1
+
+    monkeypatch.setattr(event_tracker, '_write', write)
+    event_tracker.flush()
+
+    stats = event_tracker.stats()
+    assert (stats['queue_depth'], stats['retried'], stats['failed']) == (0, 1, 0)
+    assert DSDownloadRecord.query.filter_by(download_cookie='retried').count() == 1
+
+
+def test_file_totals_follow_files_and_feature_models(tracked_dataset):
+    fm_meta_data = FMMetaData(uvl_filename='a.uvl', title='A', description='', publication_type=PublicationType.NONE)
+    feature_model = FeatureModel(
+        data_set_id=tracked_dataset.id,
+        fm_meta_data=fm_meta_data,
+        files=[Hubfile(name='a.uvl', checksum='', size=100), Hubfile(name='b.uvl', checksum='', size=50)],
+    )
+    db.session.add(feature_model)
+    db.session.commit()
+    assert (tracked_dataset.get_files_count(), tracked_dataset.get_file_total_size()) == (2, 150)
+
+    feature_model.files[0].size = 300
+    db.session.delete(feature_model.files[1])
+    db.session.commit()
+    assert (tracked_dataset.file_count, tracked_dataset.total_size) == (1, 300)
+
+    db.session.delete(feature_model)
+    db.session.commit()
+    assert (tracked_dataset.file_count, tracked_dataset.total_size) == (0, 0)
+
+
+def test_tags_are_linked_to_shared_tag_rows(test_client):
+    first = DSMetaData(
+        title='Tagged', description='', publication_type=PublicationType.NONE, tags='Cars, trucks,cars, '
+    )
+    second = FMMetaData(uvl_filename='t.uvl', title='T', description='', publication_type=PublicationType.NONE)
+    second.tags = 'trucks'
+    db.session.add_all([first, second])
+    db.session.commit()
+
+    assert [tag.name for tag in first.tag_list] == ['cars', 'trucks']
+    assert second.tag_list == [Tag.query.filter_by(name='trucks').one()]
+
+    first.tags = 'vans'
+    db.session.commit()
+    assert [tag.name for tag in first.tag_list] == ['vans']
+
+
+def test_tags_differing_only_by_accents_are_distinct(test_client):
+    meta_data = DSMetaData(
+        title='Accents', description='', publication_type=PublicationType.NONE, tags='cafe, café, Café'
+    )
+    db.session.add(meta_data)
+    db.session.commit()
+
+    assert [tag.name for tag in meta_data.tag_list] == ['cafe', 'café']
+    assert Tag.query.filter(Tag.name.in_(['cafe', 'café'])).count() == 2
+
+
+def test_dataset_api_serializes_fields_and_related_files(test_client, tracked_dataset):
+    feature_model = FeatureModel(
+        data_set_id=tracked_dataset.id,
+        fm_meta_data=FMMetaData(uvl_filename='a.uvl', title='A', description='', publication_type=PublicationType.NONE),
+        files=[Hubfile(name='a.uvl', checksum='', size=2048)],
+    )
+    db.session.add(feature_model)
+    db.session.commit()
+
+    response = test_client.get(f'/api/v1/datasets/{tracked_dataset.id}')
+
+    assert response.status_code == 200
+    assert response.json == {
+        'dataset_id': tracked_dataset.id,
+        'created': tracked_dataset.created_at.isoformat(),
+        'name': 'Tracked',
+        'doi': 'http://localhost/doi/None',
+        'files': [{'file_id': feature_model.files[0].id, 'file_name': 'a.uvl', 'size': '2.0 KB'}],
+    }
+    listing = test_client.get('/api/v1/datasets/').json['items']
+    assert response.json in listing
+
+
+def test_orjson_provider_matches_the_default_provider(test_client):
+    app = test_client.application
+    value = {
+        'b': [1, 2.5, None, True],
+        'a': {'created': datetime(2024, 5, 1, 12, 30), 'price': decimal.Decimal('1.10'), 'name': 'Señal'},
+        'ids': {1: 'one', 2: 'two'},
+        'wide': 2**70,
+    }
+
+    assert isinstance(app.json, OrjsonProvider)
+    assert app.json.loads(app.json.dumps(value)) == DefaultJSONProvider(app).loads(
+        DefaultJSONProvider(app).dumps(value)
+    )
+    assert app.json.dumps(value['ids']) == DefaultJSONProvider(app).dumps(value['ids'], separators=(',', ':'))
+    with app.test_request_context():
+        assert app.json.response(value).get_json() == DefaultJSONProvider(app).response(value).get_json()
+
+
 if __name__ == "__main__":
     pytest.main()
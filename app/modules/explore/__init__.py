@@ -1,3 +1,14 @@
+import click
+
 from core.blueprints.base_blueprint import BaseBlueprint
 
 explore_bp = BaseBlueprint('explore', __name__, template_folder='templates')
+
+
+@explore_bp.cli.command('reindex')
+def reindex():
+    """Rebuilds the explore search index and indexes the UVL files not parsed yet."""
+    from app.modules.explore.services import reindex
+
+    extracted = reindex()
+    click.echo(f"Explore search index rebuilt, {extracted} new UVL files indexed.")
@@ -4,12 +4,26 @@ document.addEventListener('DOMContentLoaded', () => {
     const resultsContainer = document.getElementById('results');
     const resultsNotFound = document.getElementById("results_not_found");
     const resultsNumber = document.getElementById('results_number');
+    const resultsSentinel = document.getElementById('results_sentinel');
+    // Criteria and cursor of the search being shown; a new search replaces them
+    let search = null;
+    const querySuggestions = document.getElementById('query_suggestions');
+    let typingTimer = null;
     sendQuery(); 
-    queryInput.addEventListener('input', sendQuery);
+    // Suggestions are cheap and follow every keystroke, the full search waits for a pause in typing
+    queryInput.addEventListener('input', () => {
+        fetchSuggestions(queryInput.value);
+        clearTimeout(typingTimer);
+        typingTimer = setTimeout(sendQuery, 250);
+    });
     new URLSearchParams(window.location.search).get('query')?.trim() && queryInput.dispatchEvent(new Event('input', { bubbles: true }));
     // Filter event listener
-    filters.forEach(filter => filter.addEventListener('input', sendQuery));
+    filters.forEach(filter => filter !== queryInput && filter.addEventListener('input', sendQuery));
     document.getElementById('clear-filters').addEventListener('click', clearFilters);
+    // Load the next page when the end of the results scrolls into view
+    new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) loadNextPage();
+    }).observe(resultsSentinel);
     //Funcion que actualiza el query con el tipo de publicacion seleccionado
     function sendQuery() {
         resultsContainer.innerHTML = '';
@@ -23,91 +37,77 @@ document.addEventListener('DOMContentLoaded', () => {
             size: document.querySelector('#size').value,
             author: document.querySelector('#authors').value,
             files: document.querySelector('#files').value,
-            title: document.querySelector('#title').value
+            title: document.querySelector('#title').value,
+            feature: document.querySelector('#feature').value,
+            attribute: document.querySelector('#attribute').value,
+            constraint_operator: document.querySelector('#constraint_operator').value,
+            construct: document.querySelector('#construct').value,
+            tags: document.querySelector('#tag').value === "any" ? [] : [document.querySelector('#tag').value]
         };
-        fetch('/explore', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(searchCriteria),
-        })
-        .then(response => response.json())
-        .then(data => handleResults(data, searchCriteria))
-        .catch(console.error);
+        search = { criteria: searchCriteria, cursor: null, loading: false };
+        fetchPage(search, { count: true, facets: true });
     }
 
-    function handleResults(data, searchCriteria) {
-        const filteredData = data.filter(dataset => filterDataset(dataset, searchCriteria));
-        const resultCount = filteredData.length;
-        
-        resultsNumber.textContent = `${resultCount} ${resultCount === 1 ? 'dataset' : 'datasets'} found`;
-        resultsNotFound.style.display = resultCount === 0 ? "block" : "none";
-
-        populateAuthorsFilter(data);
-        populateTitleFilter(data);
-
-        filteredData.forEach(dataset => resultsContainer.appendChild(createDatasetCard(dataset)));
-    }
-
-    function filterDataset(dataset, { size, author, title, files }) {
-        const matchesSize = matchSize(dataset.total_size_in_bytes, size);
-        const matchesAuthor = author === "any" || dataset.authors.some(({ name }) => name === author);
-        const matchesTitle = title === "any" || matchTitle(dataset.title, title);
-        const matchesFiles = matchFiles(dataset.files_count, files);
-
-        return matchesSize && matchesAuthor && matchesTitle && matchesFiles;
-    }
-
-
-    function matchTitle(datasetTitle, title) {
-        return Array.isArray(datasetTitle) ? datasetTitle.includes(title) : datasetTitle === title;
+    function fetchSuggestions(prefix) {
+        if (!prefix.trim()) {
+            querySuggestions.innerHTML = '';
+            return;
+        }
+        fetch(`/explore/suggest?q=${encodeURIComponent(prefix)}`)
+        .then(response => response.json())
+        .then(({ suggestions }) => {
+            // Keep the suggestions of the latest input only
+            if (prefix !== queryInput.value) return;
+            querySuggestions.innerHTML = '';
+            suggestions.forEach(({ kind, value }) => {
+                const option = document.createElement('option');
+                option.value = value;
+                option.label = kind;
+                querySuggestions.appendChild(option);
+            });
+        })
+        .catch(console.error);
     }
 
-    function matchFiles(filesCount, files) {
-        // Convert `filesCount` to a number if it's not already
-        filesCount = Number(filesCount);
-    
-        const filesMap = {
-            "any": true,
-            "1file": filesCount === 1,
-            "2files": filesCount === 2,
-            "3files": filesCount === 3,
-            "4files": filesCount === 4,
-            "5files": filesCount === 5,
-            "6files": filesCount === 6,
-            "7files": filesCount === 7,
-            "8files": filesCount === 8,
-            "9files": filesCount === 9,
-            "moreThan10files": filesCount > 10,
-        };
-        // List of allowed values for `files`
-        const allowedFilesValues = Object.keys(filesMap);
-        // Ensure the `files` value is one of the allowed keys
-        if (!allowedFilesValues.includes(files)) {
-            console.warn(`Invalid files value: ${files}. Defaulting to "any"`);
-            files = "any"; // Use default value if not valid
+    function loadNextPage() {
+        if (search && search.cursor && !search.loading) {
+            fetchPage(search, { cursor: search.cursor });
         }
-        // If `files` value exists in `filesMap`, use it, otherwise return true by default
-        return filesMap[files] ?? true;
     }
 
+    function fetchPage(currentSearch, paging) {
+        currentSearch.loading = true;
+        fetch('/explore', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ...currentSearch.criteria, ...paging }),
+        })
+        .then(response => response.json())
+        .then(page => {
+            // Ignore pages of a search that has been replaced meanwhile
+            if (currentSearch === search) handleResults(page, currentSearch);
+        })
+        .catch(console.error)
+        .finally(() => {
+            currentSearch.loading = false;
+            // The observer only fires on changes, so keep going while the page does not fill the view
+            if (currentSearch === search && resultsSentinel.getBoundingClientRect().top < window.innerHeight) {
+                loadNextPage();
+            }
+        });
+    }
 
-    function matchSize(totalSize, size) {
-        const sizeMap = {
-            lessThan1KB: totalSize < 1024,
-            between1KBand2KB: totalSize >= 1024 && totalSize < 2048,
-            between2KBand3KB: totalSize >= 2048 && totalSize < 3072,
-            between3KBand4KB: totalSize >= 3072 && totalSize < 4096,
-            between4KBand5KB: totalSize >= 4096 && totalSize < 5120,
-            moreThan5KB: totalSize > 5120,
-        };
-        // Validate that `size` is one of the expected keys
-        if (!(size in sizeMap)) {
-            console.warn(`Invalid size value: ${size}. Returning default value.`);
-            return true;  // or your preferred default behavior
+    function handleResults(page, currentSearch) {
+        // Every filter is already applied by the server
+        if (page.total !== undefined) {
+            const resultCount = page.total;
+            resultsNumber.textContent = `${resultCount} ${resultCount === 1 ? 'dataset' : 'datasets'} found`;
+            resultsNotFound.style.display = resultCount === 0 ? "block" : "none";
         }
+        currentSearch.cursor = page.next_cursor;
+        if (page.facets) populateFilters(page.facets);
 
-        // Safely access the sizeMap with the validated key
-        return sizeMap[size];
+        page.datasets.forEach(dataset => resultsContainer.appendChild(createDatasetCard(dataset)));
     }
     
     function createDatasetCard(dataset) {
@@ -148,29 +148,41 @@ document.addEventListener('DOMContentLoaded', () => {
         return card;
     }
 
-    function populateAuthorsFilter(data) {
-        populateDropdown(data.flatMap(({ authors }) => authors.map(({ name }) => name)), 'authors');
-    }
-
-    function populateTitleFilter(data) {
-        populateDropdown(data.map(({ title }) => title), 'title');
+    function populateFilters(facets) {
+        // Facet counts cover every match, not only the pages loaded so far
+        populateDropdown(facets.authors, 'authors');
+        populateDropdown(facets.titles, 'title');
+        populateDropdown(facets.tags, 'tag');
+        populateDropdown(facets.features, 'feature');
+        populateDropdown(facets.attributes, 'attribute');
+        populateDropdown(facets.constraint_operators, 'constraint_operator');
+        populateDropdown(facets.constructs, 'construct');
+        const publicationTypeCounts = new Map(facets.publication_type.map(({ value, count }) => [value, count]));
+        document.querySelectorAll('#publication_type option').forEach(option => {
+            option.dataset.label = option.dataset.label || option.textContent;
+            const count = publicationTypeCounts.get(option.value);
+            option.textContent = count ? `${option.dataset.label} (${count})` : option.dataset.label;
+        });
     }
 
-    function populateDropdown(items, elementId) {
-        const uniqueItems = Array.from(new Set(items));
+    function populateDropdown(facet, elementId) {
         const selectElement = document.getElementById(elementId);
         const currentSelection = selectElement.value;
         selectElement.innerHTML = '<option value="any">Any</option>';
-        uniqueItems.forEach(item => {
+        facet.forEach(({ value, count }) => {
             const option = document.createElement('option');
-            option.value = item;
-            option.textContent = item;
+            option.value = value;
+            option.textContent = `${value} (${count})`;
             selectElement.appendChild(option);
         });
 
-        if (uniqueItems.includes(currentSelection)) {
-            selectElement.value = currentSelection;
+        if (currentSelection !== "any" && !facet.some(({ value }) => value === currentSelection)) {
+            const option = document.createElement('option');
+            option.value = currentSelection;
+            option.textContent = currentSelection;
+            selectElement.appendChild(option);
         }
+        selectElement.value = currentSelection;
     }
 
     function formatDate(dateString) {
@@ -185,7 +197,11 @@ document.addEventListener('DOMContentLoaded', () => {
         document.querySelector('#size').value = "any";
         document.querySelector('#title').value = "any";
         document.querySelector('#tag').value = "any";
-        document.querySelector('[name="sorting"][value="newest"]').checked = true;
+        document.querySelector('#feature').value = "any";
+        document.querySelector('#attribute').value = "any";
+        document.querySelector('#constraint_operator').value = "any";
+        document.querySelector('#construct').value = "any";
+        document.querySelector('[name="sorting"][value="relevance"]').checked = true;
         queryInput.dispatchEvent(new Event('input', { bubbles: true }));
     }
 });
@@ -0,0 +1,54 @@
+from app import db
+
+
+class SearchIndexEntry(db.Model):
+    """Posting of the explore inverted index: how strongly a term is associated with a dataset."""
+
+    __tablename__ = 'search_index'
+    term = db.Column(db.String(64), primary_key=True)
+    dataset_id = db.Column(db.Integer, db.ForeignKey('data_set.id', ondelete='CASCADE'), primary_key=True, index=True)
+    weight = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'SearchIndexEntry<{self.term} {self.dataset_id}={self.weight}>'
+
+
+class SearchTrigram(db.Model):
+    """Trigram of a term of the inverted index, to find the terms that look like a misspelled word."""
+
+    __tablename__ = 'search_trigram'
+    trigram = db.Column(db.String(3), primary_key=True)
+    term = db.Column(db.String(64), primary_key=True)
+
+    def __repr__(self):
+        return f'SearchTrigram<{self.trigram} {self.term}>'
+
+
+class UVLContentExtraction(db.Model):
+    """UVL file contents already extracted, by checksum, so that each distinct file is only parsed once."""
+
+    __tablename__ = 'uvl_content_extraction'
+    checksum = db.Column(db.String(120), primary_key=True)
+    parsed = db.Column(db.Boolean, nullable=False)
+
+    def __repr__(self):
+        return f'UVLContentExtraction<{self.checksum} parsed={self.parsed}>'
+
+
+class UVLContentEntry(db.Model):
+    """Feature name, attribute name, constraint operator or group kind found in the UVL files with a checksum."""
+
+    __tablename__ = 'uvl_content'
+    checksum = db.Column(db.String(120), primary_key=True)
+    kind = db.Column(db.String(32), primary_key=True)
+    value = db.Column(db.String(120), primary_key=True)
+
+    __table_args__ = (db.Index('ix_uvl_content_kind_value', 'kind', 'value'),)
+
+    def __repr__(self):
+        return f'UVLContentEntry<{self.checksum} {self.kind}={self.value}>'
+
+
+def uvl_content_value(text: str) -> str:
+    """How feature names and the other UVL contents are stored and looked up: unquoted and case-insensitive."""
+    return ' '.join((text or '').strip().strip('"').split()).lower()[:120]
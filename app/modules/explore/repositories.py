@@ -1,43 +1,141 @@
-import re
-from sqlalchemy import any_, or_
-import unidecode
-from app.modules.dataset.models import Author, DSMetaData, DataSet, PublicationType
-from app.modules.featuremodel.models import FMMetaData, FeatureModel
+import math
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_, select, union_all
+from sqlalchemy.orm import contains_eager
+from app.modules.dataset.models import Author, DSMetaData, DataSet, PublicationType, Tag, ds_meta_data_tag, parse_tags
+from app.modules.dataset.repositories import dataset_graph_options
+from app.modules.explore.models import (
+    SearchIndexEntry,
+    SearchTrigram,
+    UVLContentEntry,
+    UVLContentExtraction,
+    uvl_content_value,
+)
+from app.modules.featuremodel.models import FeatureModel
+from app.modules.hubfile.models import Hubfile
 from core.repositories.BaseRepository import BaseRepository
+from core.search.trigram import similarity, trigrams
+
+# Values of the explore size and files filters -> [minimum, maximum) bounds, None for unbounded
+SIZE_RANGES = {
+    'lessThan1KB': (None, 1024),
+    'between1KBand2KB': (1024, 2048),
+    'between2KBand3KB': (2048, 3072),
+    'between3KBand4KB': (3072, 4096),
+    'between4KBand5KB': (4096, 5120),
+    'moreThan5KB': (5121, None),
+}
+FILES_RANGES = {
+    '1file': (1, 2),
+    **{f'{count}files': (count, count + 1) for count in range(2, 10)},
+    'moreThan10files': (11, None),
+}
+
+
+# Facet -> criteria that lift its own filter
+FACET_FILTERS = {
+    'publication_type': {'publication_type': 'any'},
+    'authors': {'author': 'any'},
+    'titles': {'title': 'any'},
+    'tags': {'tags': []},
+    'features': {'feature': 'any'},
+    'attributes': {'attribute': 'any'},
+    'constraint_operators': {'constraint_operator': 'any'},
+    'constructs': {'construct': 'any'},
+}
+# UVL content facet -> kind of entry it counts
+UVL_CONTENT_FACETS = {
+    'features': 'feature',
+    'attributes': 'attribute',
+    'constraint_operators': 'constraint_operator',
+    'constructs': 'construct',
+}
+
+
+def in_range(column, bounds):
+    minimum, maximum = bounds
+    conditions = []
+    if minimum is not None:
+        conditions.append(column >= minimum)
+    if maximum is not None:
+        conditions.append(column < maximum)
+    return conditions
+
+
+def ordered(keys, descending):
+    return [key.desc() if descending else key.asc() for key in keys]
+
+
+def seek(keys, values, descending):
+    """Rows strictly after values in the order of keys, spelled out so that indexes can be used."""
+    key, *rest_keys = keys
+    value, *rest_values = values
+    after = key < value if descending else key > value
+    if not rest_keys:
+        return after
+    return or_(after, and_(key == value, seek(rest_keys, rest_values, descending)))
+
+
+def with_uvl_contents(datasets):
+    """Joins the UVL content entries of the files of each dataset."""
+    return (
+        datasets.join(FeatureModel, FeatureModel.data_set_id == DataSet.id)
+        .join(Hubfile, Hubfile.feature_model_id == FeatureModel.id)
+        .join(UVLContentEntry, UVLContentEntry.checksum == Hubfile.checksum)
+    )
+
+
+def contains_uvl(kind: str, value: str):
+    """Whether a file of the dataset has the given feature name, attribute, constraint operator or construct."""
+    return (
+        select(FeatureModel.id)
+        .join(Hubfile, Hubfile.feature_model_id == FeatureModel.id)
+        .join(UVLContentEntry, UVLContentEntry.checksum == Hubfile.checksum)
+        .where(
+            FeatureModel.data_set_id == DataSet.id,
+            UVLContentEntry.kind == kind,
+            UVLContentEntry.value == uvl_content_value(value),
+        )
+        .exists()
+    )
 
 
 class ExploreRepository(BaseRepository):
     def __init__(self):
         super().__init__(DataSet)
+        self.search_index_repository = SearchIndexRepository()
 
-    def filter(self, query="", sorting="newest", publication_type="any", tags=[], **kwargs):
-        # Normalize and remove unwanted characters
-        normalized_query = unidecode.unidecode(query).lower()
-        cleaned_query = re.sub(r'[,.":\'()\[\]^;!¡¿?]', "", normalized_query)
-
-        filters = []
-        for word in cleaned_query.split():
-            filters.append(DSMetaData.title.ilike(f"%{word}%"))
-            filters.append(DSMetaData.description.ilike(f"%{word}%"))
-            filters.append(Author.name.ilike(f"%{word}%"))
-            filters.append(Author.affiliation.ilike(f"%{word}%"))
-            filters.append(Author.orcid.ilike(f"%{word}%"))
-            filters.append(FMMetaData.uvl_filename.ilike(f"%{word}%"))
-            filters.append(FMMetaData.title.ilike(f"%{word}%"))
-            filters.append(FMMetaData.description.ilike(f"%{word}%"))
-            filters.append(FMMetaData.publication_doi.ilike(f"%{word}%"))
-            filters.append(FMMetaData.tags.ilike(f"%{word}%"))
-            filters.append(DSMetaData.tags.ilike(f"%{word}%"))
-
-        datasets = (
-            self.model.query.join(DataSet.ds_meta_data)
-            .join(DSMetaData.authors)
-            .join(DataSet.feature_models)
-            .join(FeatureModel.fm_meta_data)
-            .filter(or_(*filters))
-            .filter(DSMetaData.dataset_doi.isnot(None))  # Exclude datasets with empty dataset_doi
+    def search(
+        self,
+        words: List[str],
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        size="any",
+        files="any",
+        author="any",
+        title="any",
+        feature="any",
+        attribute="any",
+        constraint_operator="any",
+        construct="any",
+        similar_terms=None,
+        **kwargs,
+    ):
+        """
+        Unordered query of the matching datasets, plus the columns that the sorting orders it by
+        (most significant first, all in the same direction) and whether that direction is descending.
+        """
+        datasets = self.model.query.join(DataSet.ds_meta_data).filter(
+            DSMetaData.dataset_doi.isnot(None)  # Exclude datasets with empty dataset_doi
         )
 
+        ranking = None
+        if words:
+            ranking = self.search_index_repository.rank(words, similar_terms)
+            datasets = datasets.join(ranking, ranking.c.dataset_id == DataSet.id)
+
         if publication_type != "any":
             matching_type = None
             for member in PublicationType:
@@ -49,12 +147,241 @@ class ExploreRepository(BaseRepository):
                 datasets = datasets.filter(DSMetaData.publication_type == matching_type.name)
 
         if tags:
-            datasets = datasets.filter(DSMetaData.tags.ilike(any_(f"%{tag}%" for tag in tags)))
+            names = [name for tag in tags for name in parse_tags(tag)]
+            datasets = datasets.filter(
+                select(ds_meta_data_tag.c.ds_meta_data_id)
+                .join(Tag, Tag.id == ds_meta_data_tag.c.tag_id)
+                .where(ds_meta_data_tag.c.ds_meta_data_id == DSMetaData.id, Tag.name.in_(names))
+                .exists()
+            )
+
+        if author != "any":
+            datasets = datasets.filter(
+                select(Author.id).where(Author.ds_meta_data_id == DSMetaData.id, Author.name == author).exists()
+            )
+
+        if title != "any":
+            datasets = datasets.filter(DSMetaData.title == title)
 
+        uvl_contents = {
+            'feature': feature,
+            'attribute': attribute,
+            'constraint_operator': constraint_operator,
+            'construct': construct,
+        }
+        for kind, value in uvl_contents.items():
+            if value != "any":
+                datasets = datasets.filter(contains_uvl(kind, value))
+
+        if size in SIZE_RANGES:
+            datasets = datasets.filter(*in_range(DataSet.total_size, SIZE_RANGES[size]))
+
+        if files in FILES_RANGES:
+            datasets = datasets.filter(*in_range(DataSet.file_count, FILES_RANGES[files]))
+
+        # Best matches first: most query words matched, then highest accumulated weight
+        if sorting == "relevance" and ranking is not None:
+            return datasets, [ranking.c.matched, ranking.c.score, self.model.created_at, self.model.id], True
         # Order by created_at
         if sorting == "oldest":
-            datasets = datasets.order_by(self.model.created_at.asc())
-        else:
-            datasets = datasets.order_by(self.model.created_at.desc())
+            return datasets, [self.model.created_at, self.model.id], False
+        return datasets, [self.model.created_at, self.model.id], True
+
+    def filter(self, words: List[str], sorting="newest", **criteria):
+        datasets, keys, descending = self.search(words, sorting, **criteria)
+        return datasets.options(*dataset_graph_options(contains_eager)).order_by(*ordered(keys, descending)).all()
+
+    def page(self, words: List[str], sorting="newest", limit=20, after=None, count=False, **criteria):
+        """
+        Up to limit (dataset, *sort keys) rows following the sort keys given in after, and the
+        number of matches overall when count is set. Seeking past the previous page instead of
+        using OFFSET keeps deep pages as cheap as the first one.
+        """
+        datasets, keys, descending = self.search(words, sorting, **criteria)
+        total = datasets.count() if count else None
+        if after is not None:
+            if len(after) != len(keys):
+                raise ValueError('The cursor does not belong to this sorting')
+            datasets = datasets.filter(seek(keys, after, descending))
+        datasets = datasets.options(*dataset_graph_options(contains_eager))
+        rows = datasets.add_columns(*keys).order_by(*ordered(keys, descending)).limit(limit).all()
+        return rows, total
 
-        return datasets.all()
+    def stream(self, words: List[str], sorting="newest", after=None, batch_size=100, **criteria):
+        """
+        Every matching dataset following the sort keys given in after, fetched in keyset pages of
+        batch_size. Each page is read in full before the next query, so the loader queries of a page
+        never interrupt an unbuffered cursor on the same connection. Raises ValueError on keys of
+        another sorting before reading anything.
+        """
+        keys = self.search(words, sorting, **criteria)[1]
+        if after is not None and len(after) != len(keys):
+            raise ValueError('The cursor does not belong to this sorting')
+        return self._stream_pages(words, sorting, after, batch_size, criteria)
+
+    def _stream_pages(self, words, sorting, after, batch_size, criteria):
+        while True:
+            rows, _ = self.page(words, sorting, limit=batch_size, after=after, **criteria)
+            for row in rows:
+                yield row[0]
+            if len(rows) < batch_size:
+                return
+            after = list(rows[-1][1:])
+
+    def facets(self, words: List[str], limit: Optional[int] = None, **criteria) -> Dict[str, list]:
+        """
+        (value, number of matching datasets) pairs of each facet, most frequent first. A facet
+        ignores its own filter, so that the other values stay selectable. Every value is
+        returned unless limit is given: the explore filters list them all in their dropdowns.
+        """
+
+        def matching(facet):
+            return self.search(words, **dict(criteria, **FACET_FILTERS[facet]))[0]
+
+        def grouped(datasets, column):
+            return (
+                datasets.with_entities(column, func.count(func.distinct(DataSet.id)).label('datasets'))
+                .group_by(column)
+                .order_by(func.count(func.distinct(DataSet.id)).desc(), column)
+                .limit(limit)
+                .all()
+            )
+
+        facets = {
+            'publication_type': [
+                (publication_type.value, count)
+                for publication_type, count in grouped(matching('publication_type'), DSMetaData.publication_type)
+            ],
+            'authors': grouped(matching('authors').join(Author, Author.ds_meta_data_id == DSMetaData.id), Author.name),
+            'titles': grouped(matching('titles'), DSMetaData.title),
+            'tags': grouped(
+                matching('tags')
+                .join(ds_meta_data_tag, ds_meta_data_tag.c.ds_meta_data_id == DSMetaData.id)
+                .join(Tag, Tag.id == ds_meta_data_tag.c.tag_id),
+                Tag.name,
+            ),
+        }
+        for facet, kind in UVL_CONTENT_FACETS.items():
+            facets[facet] = grouped(
+                with_uvl_contents(matching(facet)).filter(UVLContentEntry.kind == kind), UVLContentEntry.value
+            )
+        return facets
+
+    def suggestion_entries(self, dataset_id: int = None) -> List[Tuple[int, str, str]]:
+        """(dataset_id, kind, value) of the titles, authors, ORCIDs and tags of published datasets."""
+        published = self.session.query(DataSet.id).join(DataSet.ds_meta_data).filter(DSMetaData.dataset_doi.isnot(None))
+        if dataset_id is not None:
+            published = published.filter(DataSet.id == dataset_id)
+
+        entries = [(id, 'title', title) for id, title in published.add_columns(DSMetaData.title)]
+        for id, name, orcid in published.join(Author, Author.ds_meta_data_id == DSMetaData.id).add_columns(
+            Author.name, Author.orcid
+        ):
+            entries += [(id, 'author', name), (id, 'orcid', orcid)]
+        entries += [
+            (id, 'tag', name)
+            for id, name in published.join(ds_meta_data_tag, ds_meta_data_tag.c.ds_meta_data_id == DSMetaData.id)
+            .join(Tag, Tag.id == ds_meta_data_tag.c.tag_id)
+            .add_columns(Tag.name)
+        ]
+        return entries
+
+
+class SearchIndexRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(SearchIndexEntry)
+
+    def replace_dataset(self, dataset_id: int, weights: Dict[str, int], commit: bool = True):
+        self.session.query(SearchIndexEntry).filter_by(dataset_id=dataset_id).delete()
+        if weights:
+            self.session.bulk_insert_mappings(
+                SearchIndexEntry,
+                [{'term': term, 'dataset_id': dataset_id, 'weight': weight} for term, weight in weights.items()],
+            )
+            # Trigrams are shared by every dataset with the term, the ones already there are skipped
+            BaseRepository(SearchTrigram).record_many_once(
+                [{'trigram': trigram, 'term': term} for term in weights for trigram in sorted(trigrams(term))],
+                commit=False,
+            )
+        if commit:
+            self.session.commit()
+
+    def clear(self):
+        self.session.query(SearchIndexEntry).delete()
+        self.session.query(SearchTrigram).delete()
+
+    def similar_terms(self, word: str, threshold: float, limit: int) -> Dict[str, float]:
+        """Up to limit indexed terms whose trigram similarity to word reaches threshold, with that similarity."""
+        word_trigrams = trigrams(word)
+        # Terms sharing fewer trigrams than this cannot reach the threshold, whatever their length
+        min_shared = max(1, math.ceil(threshold * len(word_trigrams)))
+        candidates = (
+            self.session.query(SearchTrigram.term)
+            .filter(SearchTrigram.trigram.in_(word_trigrams))
+            .group_by(SearchTrigram.term)
+            .having(func.count() >= min_shared)
+        )
+        scored = ((term, similarity(word, term)) for (term,) in candidates)
+        similar = sorted((item for item in scored if item[1] >= threshold), key=lambda item: (-item[1], item[0]))
+        return dict(similar[:limit])
+
+    def rank(self, words: List[str], similar_terms: Dict[str, Dict[str, float]] = None):
+        """
+        (dataset_id, matched, score) of every dataset having a term that starts with one of the
+        words, or that is one of the terms similar to it. Similar terms count with their weight
+        scaled down by their similarity. Prefix lookups are range scans on the primary key, so
+        they stay fast as the index grows.
+        """
+        similar_terms = similar_terms or {}
+        per_word = []
+        for word in words:
+            similar = {term: score for term, score in similar_terms.get(word, {}).items() if not term.startswith(word)}
+            matches_word = SearchIndexEntry.term.like(f'{word}%')
+            weight = SearchIndexEntry.weight
+            if similar:
+                matches_word = or_(matches_word, SearchIndexEntry.term.in_(similar))
+                weight = weight * case(similar, value=SearchIndexEntry.term, else_=1.0)
+            per_word.append(
+                select(SearchIndexEntry.dataset_id, func.sum(weight).label('score'))
+                .where(matches_word)
+                .group_by(SearchIndexEntry.dataset_id)
+            )
+        matches = (union_all(*per_word) if len(per_word) > 1 else per_word[0]).subquery()
+        return (
+            select(
+                matches.c.dataset_id,
+                func.count().label('matched'),
+                func.sum(matches.c.score).label('score'),
+            )
+            .group_by(matches.c.dataset_id)
+            .subquery()
+        )
+
+
+class UVLContentRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(UVLContentExtraction)
+
+    def record(self, checksum: str, parsed: bool, entries, commit: bool = True) -> bool:
+        """
+        Stores the (kind, value) entries extracted from the files with checksum, unless another
+        worker got there first. Returns whether they were stored.
+        """
+        recorded = self.record_once(commit=False, checksum=checksum, parsed=parsed)
+        if recorded:
+            BaseRepository(UVLContentEntry).record_many_once(
+                [{'checksum': checksum, 'kind': kind, 'value': value} for kind, value in sorted(entries)], commit=False
+            )
+        if commit:
+            self.session.commit()
+        return recorded
+
+    def pending_files(self) -> List[Hubfile]:
+        """One file per checksum whose contents have not been extracted yet."""
+        first_files = (
+            self.session.query(func.min(Hubfile.id))
+            .outerjoin(UVLContentExtraction, UVLContentExtraction.checksum == Hubfile.checksum)
+            .filter(UVLContentExtraction.checksum.is_(None))
+            .group_by(Hubfile.checksum)
+        )
+        return self.session.query(Hubfile).filter(Hubfile.id.in_(first_files)).all()
@@ -2,7 +2,8 @@ from flask import render_template, request, jsonify
 
 from app.modules.explore import explore_bp
 from app.modules.explore.forms import ExploreForm
-from app.modules.explore.services import ExploreService
+from app.modules.explore.services import ExploreService, SuggestionService
+from core.responses.ndjson_responses import ndjson_response, wants_ndjson
 
 
 @explore_bp.route('/explore', methods=['GET', 'POST'])
@@ -14,5 +15,15 @@ def index():
 
     if request.method == 'POST':
         criteria = request.get_json()
-        datasets = ExploreService().filter(**criteria)
-        return jsonify([dataset.to_dict() for dataset in datasets])
+        try:
+            if wants_ndjson():
+                return ndjson_response(ExploreService().stream(**criteria), lambda dataset: dataset.to_dict())
+            return jsonify(ExploreService().serialized_page(**criteria))
+        except ValueError as error:
+            return jsonify({'error': str(error)}), 400
+
+
+@explore_bp.route('/explore/suggest', methods=['GET'])
+def suggest():
+    suggestions = SuggestionService().suggest(request.args.get('q', ''), request.args.get('limit', 10, type=int))
+    return jsonify({'suggestions': suggestions})
@@ -0,0 +1,11 @@
+from app.modules.explore.services import SearchIndexService, UVLContentService
+from core.seeders.BaseSeeder import BaseSeeder
+
+
+class SearchIndexSeeder(BaseSeeder):
+    # Runs after every other seeder, so the seeded datasets and their files are searchable
+    priority = 100
+
+    def run(self):
+        SearchIndexService().rebuild()
+        UVLContentService().extract_pending()
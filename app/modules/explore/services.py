@@ -1,10 +1,381 @@
-from app.modules.explore.repositories import ExploreRepository
+import base64
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Set, Tuple
+
+import unidecode
+from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+from flask import current_app, request
+
+from app.modules.dataset.models import DataSet
+from app.modules.explore.models import uvl_content_value
+from app.modules.explore.repositories import ExploreRepository, SearchIndexRepository, UVLContentRepository
+from app.modules.hubfile.services import HubfileService
+from app.modules.statistics.services import StatisticsService
+from core.caching.ttl_cache import TTLCache
+from core.responses.ndjson_responses import STREAM_BATCH_SIZE
+from core.search.prefix_index import PrefixIndex
 from core.services.BaseService import BaseService
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Statistic bumped whenever what explore can show changes, so that cached results of every worker go stale
+CATALOG_VERSION = 'catalog_version'
+# Criteria besides the query, sorting, publication type and tags that make up a cached page
+MAX_SUGGESTIONS = 20
+PAGE_CRITERIA = (
+    'size',
+    'files',
+    'author',
+    'title',
+    'feature',
+    'attribute',
+    'constraint_operator',
+    'construct',
+    'cursor',
+    'page_size',
+    'count',
+    'facets',
+)
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+MAX_TERM_LENGTH = 64
+
+# How much a term found in each field counts towards the score of a dataset
+FIELD_WEIGHTS = {
+    'title': 10,
+    'author_name': 5,
+    'fm_title': 4,
+    'uvl_filename': 4,
+    'description': 3,
+    'tags': 2,
+    'fm_description': 2,
+    'fm_tags': 1,
+    'affiliation': 1,
+    'orcid': 1,
+    'fm_publication_doi': 1,
+}
+# Misspelled query words also match the indexed terms this similar to them, up to a few per word
+SIMILARITY_THRESHOLD = 0.3
+MAX_SIMILAR_TERMS = 5
+MIN_SIMILAR_WORD_LENGTH = 3
+
+
+def tokenize(text) -> List[str]:
+    """Lowercase ASCII words of text, the same way for indexed fields and queries."""
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_PATTERN.findall(unidecode.unidecode(text or '').lower())]
+
+
+def dataset_fields(dataset: DataSet):
+    ds_meta_data = dataset.ds_meta_data
+    yield 'title', ds_meta_data.title
+    yield 'description', ds_meta_data.description
+    yield 'tags', ds_meta_data.tags
+    for author in ds_meta_data.authors:
+        yield 'author_name', author.name
+        yield 'affiliation', author.affiliation
+        yield 'orcid', author.orcid
+    for feature_model in dataset.feature_models:
+        fm_meta_data = feature_model.fm_meta_data
+        yield 'uvl_filename', fm_meta_data.uvl_filename
+        yield 'fm_title', fm_meta_data.title
+        yield 'fm_description', fm_meta_data.description
+        yield 'fm_tags', fm_meta_data.tags
+        yield 'fm_publication_doi', fm_meta_data.publication_doi
+
+
+def dataset_terms(dataset: DataSet) -> Dict[str, int]:
+    weights = Counter()
+    for field, text in dataset_fields(dataset):
+        for token in tokenize(text):
+            weights[token] += FIELD_WEIGHTS[field]
+    return dict(weights)
+
+
+def encode_cursor(keys) -> str:
+    """Opaque token of the sort keys of the last dataset on a page."""
+    values = [
+        ['t', key.isoformat()] if isinstance(key, datetime) else key if isinstance(key, int) else float(key)
+        for key in keys
+    ]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        keys = [datetime.fromisoformat(value[1]) if isinstance(value, list) else value for value in values]
+    except (ValueError, TypeError, IndexError):
+        raise ValueError('Invalid cursor')
+    if not all(isinstance(key, (datetime, int, float)) and not isinstance(key, bool) for key in keys):
+        raise ValueError('Invalid cursor')
+    return keys
+
+
+def parse_page_size(value) -> int:
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except TypeError:
+        raise ValueError('page_size must be a positive number')
+    if size < 1:
+        raise ValueError('page_size must be a positive number')
+    return min(size, MAX_PAGE_SIZE)
+
+
+def bump_catalog_version(commit: bool = True):
+    StatisticsService().increment(CATALOG_VERSION, commit=commit)
+
+
+def results_cache() -> TTLCache:
+    cache = current_app.extensions.get('explore_results_cache')
+    if cache is None:
+        cache = TTLCache(current_app.config['EXPLORE_CACHE_MAX_ENTRIES'], current_app.config['EXPLORE_CACHE_TTL'])
+        current_app.extensions['explore_results_cache'] = cache
+    return cache
+
+
+def results_cache_key(query="", sorting="newest", publication_type="any", tags=[], **criteria) -> str:
+    """Equal for every request that explore answers with the same page."""
+    return json.dumps(
+        {
+            'words': sorted(set(tokenize(query))),
+            'sorting': sorting,
+            'publication_type': publication_type,
+            'tags': sorted(tags),
+            **{name: criteria.get(name) for name in PAGE_CRITERIA},
+            'host': request.host_url,
+        },
+        sort_keys=True,
+    )
+
 
 class ExploreService(BaseService):
     def __init__(self):
         super().__init__(ExploreRepository())
 
     def filter(self, query="", sorting="newest", publication_type="any", tags=[], **kwargs):
-        return self.repository.filter(query, sorting, publication_type, tags, **kwargs)
+        words, similar_terms = self.search_terms(query)
+        return self.repository.filter(
+            words, sorting, publication_type=publication_type, tags=tags, similar_terms=similar_terms, **kwargs
+        )
+
+    def search_terms(self, query: str):
+        """Distinct words of the query and, for each long enough, the indexed terms that look like it."""
+        words = list(dict.fromkeys(tokenize(query)))
+        similar_terms = {
+            word: self.repository.search_index_repository.similar_terms(word, SIMILARITY_THRESHOLD, MAX_SIMILAR_TERMS)
+            for word in words
+            if len(word) >= MIN_SIMILAR_WORD_LENGTH
+        }
+        return words, similar_terms
+
+    def page(self, query="", sorting="newest", cursor=None, page_size=None, count=False, facets=False, **criteria):
+        """
+        One page of matching datasets with the cursor of the next one (None on the last page), the
+        number of matches overall when count is set, and the facet counts of all matches when facets
+        is set. Raises ValueError on invalid paging arguments.
+        """
+        limit = parse_page_size(page_size)
+        after = decode_cursor(cursor) if cursor else None
+        words, similar_terms = self.search_terms(query)
+        criteria['similar_terms'] = similar_terms
+        rows, total = self.repository.page(words, sorting, limit=limit + 1, after=after, count=count, **criteria)
+
+        page = {'datasets': [row[0] for row in rows[:limit]], 'next_cursor': None}
+        if len(rows) > limit:
+            page['next_cursor'] = encode_cursor(rows[limit - 1][1:])
+        if count:
+            page['total'] = total
+        if facets:
+            page['facets'] = {
+                facet: [{'value': value, 'count': count} for value, count in counts]
+                for facet, counts in self.repository.facets(words, sorting=sorting, **criteria).items()
+            }
+        return page
+
+    def stream(self, query="", sorting="newest", cursor=None, **criteria):
+        """
+        Every matching dataset in order, from the cursor on if given, a batch at a time.
+        The paging, count and facet arguments of page() do not apply. Raises ValueError on an invalid
+        cursor before reading anything.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        words, similar_terms = self.search_terms(query)
+        return self.repository.stream(
+            words, sorting, after=after, batch_size=STREAM_BATCH_SIZE, similar_terms=similar_terms, **criteria
+        )
+
+    def serialized_page(self, **criteria) -> dict:
+        """
+        page() with the datasets serialized, served from a cache of up to EXPLORE_CACHE_MAX_ENTRIES
+        pages kept for EXPLORE_CACHE_TTL seconds. Entries are keyed on the catalog version too, so
+        publishing, editing or deleting a dataset makes all of them stale at once.
+        """
+        if current_app.config.get('EXPLORE_CACHE_TTL', 0) <= 0:
+            return self.serialize(self.page(**criteria))
+
+        key = (StatisticsService().get_value(CATALOG_VERSION), results_cache_key(**criteria))
+        page = results_cache().get(key)
+        if page is None:
+            page = self.serialize(self.page(**criteria))
+            results_cache().set(key, page)
+        return page
+
+    @staticmethod
+    def serialize(page: dict) -> dict:
+        return {**page, 'datasets': [dataset.to_dict() for dataset in page['datasets']]}
+
+
+def suggestion_key(text: str) -> str:
+    return ' '.join(tokenize(text))
+
+
+class SuggestionService(BaseService):
+    """
+    Autocompletion of titles, authors, ORCIDs and tags of published datasets from an in-memory
+    prefix index per worker. The worker that publishes or edits a dataset updates that dataset's
+    entries in place. The others rebuild once they notice that the catalog version moved, checking
+    at most every EXPLORE_SUGGEST_REFRESH_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        super().__init__(ExploreRepository())
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        suggestions = self.index().search(suggestion_key(prefix), limit=max(1, min(limit, MAX_SUGGESTIONS)))
+        return [{'kind': kind, 'value': value, 'datasets': datasets} for kind, value, datasets in suggestions]
+
+    def update_dataset(self, dataset_id: int):
+        state = current_app.extensions.get('explore_suggestions')
+        if state is not None:
+            entries = [(kind, value) for _, kind, value in self.repository.suggestion_entries(dataset_id)]
+            state['index'].replace(dataset_id, entries)
+
+    def index(self) -> PrefixIndex:
+        state = current_app.extensions.setdefault(
+            'explore_suggestions', {'index': None, 'version': None, 'checked': 0.0, 'lock': threading.Lock()}
+        )
+        now = time.monotonic()
+        if state['index'] is not None and now < state['checked']:
+            return state['index']
+
+        with state['lock']:
+            if state['index'] is None or now >= state['checked']:
+                version = StatisticsService().get_value(CATALOG_VERSION)
+                if state['index'] is None or version != state['version']:
+                    state['index'] = self.build()
+                    state['version'] = version
+                state['checked'] = now + current_app.config.get('EXPLORE_SUGGEST_REFRESH_INTERVAL', 30)
+        return state['index']
+
+    def build(self) -> PrefixIndex:
+        entries = {}
+        for dataset_id, kind, value in self.repository.suggestion_entries():
+            entries.setdefault(dataset_id, []).append((kind, value))
+        index = PrefixIndex(normalize=suggestion_key)
+        for dataset_id, dataset_entries in entries.items():
+            index.replace(dataset_id, dataset_entries)
+        return index
+
+
+class SearchIndexService(BaseService):
+    def __init__(self):
+        super().__init__(SearchIndexRepository())
+
+    def index_dataset(self, dataset: DataSet, commit: bool = True):
+        bump_catalog_version(commit=False)
+        self.repository.replace_dataset(dataset.id, dataset_terms(dataset), commit=commit)
+
+    def rebuild(self):
+        self.repository.clear()
+        for dataset in DataSet.query.all():
+            self.index_dataset(dataset, commit=False)
+        self.repository.session.commit()
+
+
+def relation_construct(relation) -> str:
+    """UVL keyword of a relation of the feature tree, 'cardinality' for [n..m] groups."""
+    if relation.is_mandatory():
+        return 'mandatory'
+    if relation.is_optional():
+        return 'optional'
+    if relation.is_alternative():
+        return 'alternative'
+    if relation.is_or():
+        return 'or'
+    return 'cardinality'
+
+
+def constraint_operators(node):
+    if node is None or not node.is_op():
+        return
+    yield node.data.name
+    yield from constraint_operators(node.left)
+    yield from constraint_operators(node.right)
+
+
+def uvl_contents(path: str) -> Set[Tuple[str, str]]:
+    """(kind, value) of the feature names, attribute names, constraint operators and constructs of a UVL file."""
+    feature_model = UVLReader(path).transform()
+    contents = set()
+    for feature in feature_model.get_features():
+        contents.add(('feature', feature.name))
+        contents.update(('attribute', attribute.name) for attribute in feature.get_attributes())
+        contents.update(('construct', relation_construct(relation)) for relation in feature.get_relations())
+    for constraint in feature_model.get_constraints():
+        contents.add(('construct', 'constraints'))
+        contents.update(('constraint_operator', operator) for operator in constraint_operators(constraint.ast.root))
+    return {(kind, uvl_content_value(value)) for kind, value in contents}
+
+
+class UVLContentService(BaseService):
+    """
+    Index of what the UVL files contain, for the explore filters. Files are parsed once per
+    checksum, as every copy of the same contents has the same entries.
+    """
+
+    def __init__(self):
+        super().__init__(UVLContentRepository())
+
+    def extract(self, checksum: str, path: str, commit: bool = True) -> bool:
+        """Parses the file at path unless its checksum was seen before. Returns whether it was parsed now."""
+        if self.repository.get_by_id(checksum) is not None:
+            return False
+        try:
+            contents, parsed = uvl_contents(path), True
+        except Exception as exc:
+            logger.warning(f"Could not extract the contents of {path}: {exc}")
+            contents, parsed = set(), False
+        return self.repository.record(checksum, parsed, contents, commit=commit)
+
+    def extract_pending(self) -> int:
+        """Extracts the contents of every stored file with a new checksum, e.g. after seeding."""
+        extracted = 0
+        for hubfile in self.repository.pending_files():
+            path = HubfileService().get_path_by_hubfile(hubfile)
+            if os.path.exists(path):
+                extracted += self.extract(hubfile.checksum, path, commit=False)
+        if extracted:
+            bump_catalog_version(commit=False)
+        self.repository.session.commit()
+        return extracted
+
+
+def reindex() -> int:
+    """
+    Rebuilds the search index and extracts the UVL files not parsed yet, returning how many.
+    The search migrations only create tables, so deployments run this after every upgrade.
+    """
+    SearchIndexService().rebuild()
+    return UVLContentService().extract_pending()
@@ -0,0 +1,486 @@
+import json
+import os
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.modules.auth.models import User
+from app.modules.dataset.models import Author, DataSet, DSMetaData, PublicationType
+from app.modules.dataset.services import DataSetService
+from app.modules.explore.models import UVLContentEntry, UVLContentExtraction
+from app.modules.explore.services import (
+    SIMILARITY_THRESHOLD,
+    ExploreService,
+    SearchIndexService,
+    UVLContentService,
+    suggestion_key,
+    tokenize,
+    uvl_contents,
+)
+from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from app.modules.hubfile.models import Hubfile
+from core.search.prefix_index import PrefixIndex
+from core.search.trigram import similarity
+
+
+UVL_EXAMPLE = os.path.join(os.path.dirname(__file__), '..', '..', 'dataset', 'uvl_examples', 'file1.uvl')
+
+
+def create_dataset(
+    title, description, tags='', doi=None, author='Jane Doe', uvl_filename='model.uvl', file_sizes=(), checksum=''
+):
+    ds_meta_data = DSMetaData(
+        title=title,
+        description=description,
+        tags=tags,
+        dataset_doi=doi,
+        publication_type=PublicationType.NONE,
+        authors=[Author(name=author, affiliation='University of Seville')],
+    )
+    dataset = DataSet(user_id=User.query.first().id, ds_meta_data=ds_meta_data)
+    fm_meta_data = FMMetaData(
+        uvl_filename=uvl_filename, title='Feature model', description='', publication_type=PublicationType.NONE
+    )
+    files = [Hubfile(name=f'{index}.uvl', checksum=checksum, size=size) for index, size in enumerate(file_sizes)]
+    dataset.feature_models.append(FeatureModel(fm_meta_data=fm_meta_data, files=files))
+    db.session.add(dataset)
+    db.session.commit()
+    SearchIndexService().index_dataset(dataset)
+    return dataset
+
+
+@pytest.fixture(scope='module')
+def test_client(test_client):
+    """
+    Extends the test_client fixture to add additional specific data for module testing.
+    """
+    with test_client.application.app_context():
+        create_dataset(
+            'Automotive product lines',
+            'Car configurations',
+            tags='cars',
+            doi='10.1234/explore.1',
+            file_sizes=(600, 700),
+            checksum='explore-chat',
+        )
+        create_dataset(
+            'Smartphones',
+            'Mobile variability of automotive dashboards',
+            doi='10.1234/explore.2',
+            author='John Roe',
+            file_sizes=(300,),
+        )
+        create_dataset('Automotive drafts', 'Not published yet', doi=None, checksum='explore-chat')
+        UVLContentService().extract('explore-chat', UVL_EXAMPLE)
+
+    yield test_client
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def titles(datasets):
+    return [dataset.ds_meta_data.title for dataset in datasets]
+
+
+def test_tokenize_normalizes_accents_and_case():
+    assert tokenize('Línea de Producto-UVL 2') == ['linea', 'de', 'producto', 'uvl', '2']
+
+
+def test_search_matches_prefixes(test_client):
+    assert titles(ExploreService().filter(query='automot')) == ['Smartphones', 'Automotive product lines']
+
+
+def test_search_requires_published_datasets(test_client):
+    assert 'Automotive drafts' not in titles(ExploreService().filter(query='automotive'))
+
+
+def test_search_ranks_title_matches_first(test_client):
+    datasets = ExploreService().filter(query='automotive', sorting='relevance')
+
+    assert titles(datasets) == ['Automotive product lines', 'Smartphones']
+
+
+def test_search_ranks_datasets_matching_more_words_first(test_client):
+    datasets = ExploreService().filter(query='dashboards automotive', sorting='relevance')
+
+    assert titles(datasets) == ['Smartphones', 'Automotive product lines']
+
+
+def test_empty_search_returns_every_published_dataset(test_client):
+    datasets = ExploreService().filter(query='')
+
+    assert all(dataset.ds_meta_data.dataset_doi for dataset in datasets)
+    assert {'Automotive product lines', 'Smartphones'} <= set(titles(datasets))
+
+
+def test_filters_by_size_and_file_count(test_client):
+    explore_service = ExploreService()
+
+    assert titles(explore_service.filter(query='automotive', size='between1KBand2KB')) == ['Automotive product lines']
+    assert titles(explore_service.filter(query='automotive', size='lessThan1KB')) == ['Smartphones']
+    assert titles(explore_service.filter(query='automotive', files='2files')) == ['Automotive product lines']
+    assert titles(explore_service.filter(query='automotive', files='moreThan10files')) == []
+
+
+def test_filters_by_author_and_title(test_client):
+    explore_service = ExploreService()
+
+    assert titles(explore_service.filter(query='automotive', author='John Roe')) == ['Smartphones']
+    assert titles(explore_service.filter(title='Automotive product lines')) == ['Automotive product lines']
+
+
+def test_pages_follow_the_cursor_without_gaps_or_repeats(test_client):
+    explore_service = ExploreService()
+    expected = [dataset.id for dataset in explore_service.filter(sorting='oldest')]
+
+    seen, cursor = [], None
+    while True:
+        page = explore_service.page(sorting='oldest', page_size=1, cursor=cursor)
+        seen += [dataset.id for dataset in page['datasets']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == expected
+
+
+def test_relevance_pages_and_total(test_client):
+    explore_service = ExploreService()
+
+    first = explore_service.page(query='automotive', sorting='relevance', page_size=1, count=True)
+    second = explore_service.page(query='automotive', sorting='relevance', page_size=1, cursor=first['next_cursor'])
+
+    assert first['total'] == 2
+    assert titles(first['datasets'] + second['datasets']) == ['Automotive product lines', 'Smartphones']
+    assert second['next_cursor'] is None
+    assert 'total' not in second
+
+
+def test_explore_endpoint_rejects_invalid_paging(test_client):
+    response = test_client.post('/explore', json={'query': '', 'cursor': 'not-a-cursor'})
+    assert response.status_code == 400
+
+    response = test_client.post('/explore', json={'query': '', 'page_size': 0})
+    assert response.status_code == 400
+
+
+def test_explore_endpoint_returns_a_page(test_client):
+    response = test_client.post('/explore', json={'query': 'automotive', 'page_size': 1, 'count': True})
+
+    assert response.status_code == 200
+    assert len(response.json['datasets']) == 1
+    assert response.json['total'] == 2
+    assert response.json['next_cursor']
+
+
+def test_explore_endpoint_streams_ndjson(test_client):
+    cursor = ExploreService().page(query='automotive', sorting='oldest', page_size=1)['next_cursor']
+    response = test_client.post(
+        '/explore', json={'query': 'automotive', 'sorting': 'oldest'}, headers={'Accept': 'application/x-ndjson'}
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    datasets = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [dataset['title'] for dataset in datasets] == ['Automotive product lines', 'Smartphones']
+
+    response = test_client.post(
+        '/explore',
+        json={'query': 'automotive', 'sorting': 'oldest', 'cursor': cursor},
+        headers={'Accept': 'application/x-ndjson'},
+    )
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['title'] for line in lines] == ['Smartphones']
+
+    response = test_client.post(
+        '/explore', json={'query': '', 'cursor': 'not-a-cursor'}, headers={'Accept': 'application/x-ndjson'}
+    )
+    assert response.status_code == 400
+
+
+def test_dataset_api_streams_ndjson(test_client):
+    listing = test_client.get('/api/v1/datasets/').json['items']
+    response = test_client.get('/api/v1/datasets/', headers={'Accept': 'application/x-ndjson'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert [json.loads(line) for line in response.get_data(as_text=True).splitlines()] == sorted(
+        listing, key=lambda item: item['dataset_id']
+    )
+
+
+def test_ndjson_streams_return_every_row_past_the_first_batch(test_client, monkeypatch):
+    # Fewer rows per batch than there are datasets, so that listings span several keyset pages
+    monkeypatch.setattr('app.modules.explore.services.STREAM_BATCH_SIZE', 1)
+    monkeypatch.setattr('core.resources.generic_resource.STREAM_BATCH_SIZE', 1)
+    headers = {'Accept': 'application/x-ndjson'}
+
+    for sorting in ('newest', 'oldest', 'relevance'):
+        response = test_client.post('/explore', json={'query': 'automotive', 'sorting': sorting}, headers=headers)
+        assert len(response.get_data(as_text=True).splitlines()) == 2
+
+    response = test_client.get('/api/v1/datasets/', headers=headers)
+    ids = [json.loads(line)['dataset_id'] for line in response.get_data(as_text=True).splitlines()]
+    assert ids == sorted(id for (id,) in db.session.query(DataSet.id))
+    assert len(ids) > 1
+
+
+def test_explore_queries_do_not_grow_with_the_results(test_client):
+    def queries_for_page_of(page_size):
+        db.session.expire_all()
+        with count_queries() as statements:
+            response = test_client.post('/explore', json={'query': '', 'page_size': page_size})
+        assert len(response.json['datasets']) == page_size
+        return len(statements)
+
+    assert queries_for_page_of(1) == queries_for_page_of(2)
+
+
+def test_dataset_api_queries_do_not_grow_with_the_results(test_client):
+    def queries_for_listing():
+        db.session.expire_all()
+        with count_queries() as statements:
+            response = test_client.get('/api/v1/datasets/')
+        assert response.status_code == 200
+        return len(statements)
+
+    before = queries_for_listing()
+    create_dataset('Unrelated', 'Listed by the API only', file_sizes=(10, 20, 30))
+
+    assert queries_for_listing() == before
+
+
+def test_metadata_updates_are_reindexed(test_client):
+    dataset = DataSet.query.join(DSMetaData).filter(DSMetaData.title == 'Smartphones').first()
+
+    DataSetService().update_dsmetadata(dataset.ds_meta_data_id, title='Tablets')
+
+    assert 'Tablets' in titles(ExploreService().filter(query='tablets'))
+    assert 'Tablets' not in titles(ExploreService().filter(query='smartphones'))
+
+    DataSetService().update_dsmetadata(dataset.ds_meta_data_id, title='Smartphones')
+
+
+@pytest.fixture
+def results_cache(test_client):
+    app = test_client.application
+    app.config['EXPLORE_CACHE_TTL'] = 60
+    app.extensions.pop('explore_results_cache', None)
+    yield
+    app.config['EXPLORE_CACHE_TTL'] = 0
+    app.extensions.pop('explore_results_cache', None)
+
+
+def test_reindex_command_indexes_existing_datasets(test_client):
+    index = SearchIndexService().repository
+    index.clear()
+    index.session.commit()
+    assert ExploreService().filter(query='automotive') == []
+
+    result = test_client.application.test_cli_runner().invoke(args=['explore', 'reindex'])
+
+    assert result.exit_code == 0, result.output
+    assert 'Automotive product lines' in titles(ExploreService().filter(query='automotive'))
+
+
+def test_explore_results_are_cached_until_the_catalog_changes(test_client, results_cache):
+    dataset = DataSet.query.join(DSMetaData).filter(DSMetaData.title == 'Automotive product lines').first()
+
+    def search(query):
+        with count_queries() as statements:
+            response = test_client.post('/explore', json={'query': query, 'sorting': 'relevance'})
+        return [dataset['title'] for dataset in response.json['datasets']], len(statements)
+
+    first, _ = search('automotive product')
+    cached, queries = search('Product  AUTOMOTIVE')
+    assert cached == first
+    assert queries == 1  # The catalog version only
+
+    DataSetService().update_dsmetadata(dataset.ds_meta_data_id, title='Automotive lines')
+    refreshed, queries = search('automotive product')
+    assert 'Automotive lines' in refreshed
+    assert queries > 1
+
+    DataSetService().update_dsmetadata(dataset.ds_meta_data_id, title='Automotive product lines')
+
+
+def test_facets_count_matches_and_ignore_their_own_filter(test_client):
+    page = ExploreService().page(query='automotive', author='John Roe', facets=True)
+    facets = {facet: {item['value']: item['count'] for item in items} for facet, items in page['facets'].items()}
+
+    assert titles(page['datasets']) == ['Smartphones']
+    assert facets['authors'] == {'Jane Doe': 1, 'John Roe': 1}
+    assert facets['titles'] == {'Smartphones': 1}
+    assert facets['publication_type'] == {'none': 1}
+    assert facets['tags'] == {}
+
+    facets = ExploreService().page(query='automotive', facets=True)['facets']
+    assert {item['value']: item['count'] for item in facets['tags']} == {'cars': 1}
+
+
+def test_filters_by_tags(test_client):
+    assert titles(ExploreService().filter(query='automotive', tags=['Cars'])) == ['Automotive product lines']
+    assert titles(ExploreService().filter(query='automotive', tags=['car'])) == []
+
+
+def test_prefix_index_replaces_entries_per_owner():
+    index = PrefixIndex(normalize=suggestion_key)
+    index.replace(1, [('title', 'Automotive product lines'), ('tag', 'cars')])
+    index.replace(2, [('tag', 'cars'), ('tag', 'carts')])
+
+    assert index.search('car') == [('tag', 'cars', 2), ('tag', 'carts', 1)]
+    assert index.search('PROD') == [('title', 'Automotive product lines', 1)]
+
+    index.replace(2, [])
+    assert index.search('car') == [('tag', 'cars', 1)]
+    index.replace(1, [])
+    assert index.search('a') == [] and len(index) == 0
+
+
+def test_suggest_endpoint_covers_published_titles_authors_and_tags(test_client):
+    def suggest(prefix):
+        response = test_client.get('/explore/suggest', query_string={'q': prefix})
+        return {(item['kind'], item['value']) for item in response.json['suggestions']}
+
+    assert suggest('autom') == {('title', 'Automotive product lines')}
+    assert suggest('lines') == {('title', 'Automotive product lines')}
+    assert ('author', 'John Roe') in suggest('roe')
+    assert ('tag', 'cars') in suggest('ca')
+    assert suggest('') == set()
+
+    # Publishing updates the index in place, without waiting for a rebuild
+    test_client.application.config['EXPLORE_SUGGEST_REFRESH_INTERVAL'] = 3600
+    suggest('warm up')
+    draft = DataSet.query.join(DSMetaData).filter(DSMetaData.title == 'Automotive drafts').first()
+    DataSetService().update_dsmetadata(draft.ds_meta_data_id, dataset_doi='10.1234/explore.3')
+    assert suggest('autom') == {('title', 'Automotive product lines'), ('title', 'Automotive drafts')}
+
+    DataSetService().update_dsmetadata(draft.ds_meta_data_id, dataset_doi=None)
+    assert suggest('autom') == {('title', 'Automotive product lines')}
+    test_client.application.config['EXPLORE_SUGGEST_REFRESH_INTERVAL'] = 0
+
+
+def test_trigram_similarity():
+    assert similarity('automotive', 'automotive') == 1
+    assert similarity('automotive', 'autmotive') > SIMILARITY_THRESHOLD
+    assert similarity('automotive', 'smartphones') < SIMILARITY_THRESHOLD
+
+
+def test_misspelled_words_match_similar_terms(test_client):
+    datasets = ExploreService().filter(query='smartphnes', sorting='relevance')
+
+    assert titles(datasets) == ['Smartphones']
+
+
+def test_exact_matches_rank_above_similar_ones(test_client):
+    create_dataset('Automation of lines', 'Assembly', doi='10.1234/explore.4')
+
+    datasets = ExploreService().filter(query='automotive', sorting='relevance')
+
+    assert titles(datasets)[:2] == ['Automotive product lines', 'Smartphones']
+
+
+def test_relevance_pages_follow_fractional_scores(test_client):
+    explore_service = ExploreService()
+    expected = [dataset.id for dataset in explore_service.filter(query='automotve lines', sorting='relevance')]
+
+    seen, cursor = [], None
+    while True:
+        page = explore_service.page(query='automotve lines', sorting='relevance', page_size=1, cursor=cursor)
+        seen += [dataset.id for dataset in page['datasets']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert len(expected) > 1
+    assert seen == expected
+
+
+def test_uvl_contents_cover_features_attributes_operators_and_constructs(tmp_path):
+    path = tmp_path / 'car.uvl'
+    path.write_text(
+        'features\n'
+        '    Car {cost 3}\n'
+        '        mandatory\n'
+        '            Engine {Power 100, electric}\n'
+        '        [1..2]\n'
+        '            Seat\n'
+        '            Bench\n'
+        '            "Sun Roof"\n'
+        '\n'
+        'constraints\n'
+        '    !Bench | Seat\n'
+    )
+
+    assert uvl_contents(str(path)) == {
+        ('feature', 'car'),
+        ('feature', 'engine'),
+        ('feature', 'seat'),
+        ('feature', 'bench'),
+        ('feature', 'sun roof'),
+        ('attribute', 'cost'),
+        ('attribute', 'power'),
+        ('attribute', 'electric'),
+        ('construct', 'mandatory'),
+        ('construct', 'cardinality'),
+        ('construct', 'constraints'),
+        ('constraint_operator', 'or'),
+        ('constraint_operator', 'not'),
+    }
+
+
+def test_uvl_contents_are_extracted_once_per_checksum(test_client, tmp_path):
+    broken = tmp_path / 'broken.uvl'
+    broken.write_text('features\n    [[[\n')
+
+    assert UVLContentService().extract('explore-chat', str(broken)) is False
+    assert UVLContentService().extract('explore-broken', str(broken)) is True
+    assert UVLContentService().extract('explore-broken', UVL_EXAMPLE) is False
+
+    assert db.session.get(UVLContentExtraction, 'explore-broken').parsed is False
+    assert UVLContentEntry.query.filter_by(checksum='explore-broken').count() == 0
+    assert UVLContentEntry.query.filter_by(checksum='explore-chat', kind='feature').count() == 10
+
+
+def test_filters_by_uvl_contents(test_client):
+    service = ExploreService()
+
+    assert titles(service.filter(feature='Peer 2 Peer')) == ['Automotive product lines']
+    assert titles(service.filter(query='automotive', construct='alternative')) == ['Automotive product lines']
+    assert titles(service.filter(constraint_operator='implies', attribute='any')) == ['Automotive product lines']
+    assert titles(service.filter(feature='Steering wheel')) == []
+    assert titles(service.filter(construct='cardinality')) == []
+
+
+def test_uvl_content_facets(test_client):
+    facets = ExploreService().page(query='automotive', construct='or', facets=True)['facets']
+    counts = {facet: {item['value']: item['count'] for item in facets[facet]} for facet in facets}
+
+    assert counts['features']['peer 2 peer'] == 1
+    assert counts['constraint_operators'] == {'implies': 1, 'or': 1}
+    assert counts['constructs'] == {'alternative': 1, 'constraints': 1, 'mandatory': 1, 'optional': 1, 'or': 1}
+    assert counts['attributes'] == {}
+
+
+def test_title_and_author_facets_list_every_value(test_client):
+    for index in range(105):
+        create_dataset(f'Catalogue {index}', 'Facet values', doi=f'10.1234/catalogue.{index}', author=f'Author {index}')
+
+    facets = ExploreService().page(query='catalogue', facets=True)['facets']
+
+    assert len(facets['titles']) == 105
+    assert len(facets['authors']) == 105
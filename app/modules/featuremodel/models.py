@@ -3,6 +3,12 @@ from sqlalchemy import Enum as SQLAlchemyEnum
 
 from app.modules.dataset.models import Author, PublicationType
 
+fm_meta_data_tag = db.Table(
+    'fm_meta_data_tag',
+    db.Column('fm_meta_data_id', db.Integer, db.ForeignKey('fm_meta_data.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True, index=True),
+)
+
 
 class FeatureModel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -29,6 +35,8 @@ class FMMetaData(db.Model):
     authors = db.relationship(
         'Author', backref='fm_metadata', lazy=True, cascade="all, delete", foreign_keys=[Author.fm_meta_data_id]
     )
+    # Normalized copy of tags, kept in sync by dataset.models.link_tags
+    tag_list = db.relationship('Tag', secondary=fm_meta_data_tag, lazy=True)
 
     def __repr__(self):
         return f'FMMetaData<{self.title}'
@@ -1,15 +1,17 @@
 from datetime import datetime, timezone
 from flask import request
+from sqlalchemy import event, inspect, select, update
 from app import db
 from app.modules.auth.models import User
 from app.modules.dataset.models import DataSet
+from app.modules.featuremodel.models import FeatureModel
 
 
 class Hubfile(db.Model):
     __tablename__ = 'file'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
-    checksum = db.Column(db.String(120), nullable=False)
+    checksum = db.Column(db.String(120), nullable=False, index=True)
     size = db.Column(db.Integer, nullable=False)
     feature_model_id = db.Column(db.Integer, db.ForeignKey('feature_model.id'), nullable=False)
 
@@ -47,13 +49,52 @@ class Hubfile(db.Model):
         return f'File<{self.id}>'
 
 
+def adjust_dataset_totals(connection, feature_model_id: int, files: int, size: int):
+    """Adds files and size to the denormalized totals of the dataset owning the feature model."""
+    dataset_id = select(FeatureModel.data_set_id).where(FeatureModel.id == feature_model_id).scalar_subquery()
+    connection.execute(
+        update(DataSet.__table__)
+        .where(DataSet.id == dataset_id)
+        .values(file_count=DataSet.file_count + files, total_size=DataSet.total_size + size)
+    )
+
+
+@event.listens_for(Hubfile, 'after_insert')
+def count_inserted_file(mapper, connection, file):
+    adjust_dataset_totals(connection, file.feature_model_id, 1, file.size)
+
+
+@event.listens_for(Hubfile, 'after_delete')
+def count_deleted_file(mapper, connection, file):
+    adjust_dataset_totals(connection, file.feature_model_id, -1, -file.size)
+
+
+@event.listens_for(Hubfile, 'after_update')
+def count_updated_file(mapper, connection, file):
+    state = inspect(file)
+    size, feature_model_id = state.attrs.size.history, state.attrs.feature_model_id.history
+    if not (size.deleted or feature_model_id.deleted):
+        return
+    old_size = size.deleted[0] if size.deleted else file.size
+    old_feature_model_id = feature_model_id.deleted[0] if feature_model_id.deleted else file.feature_model_id
+    adjust_dataset_totals(connection, old_feature_model_id, -1, -old_size)
+    adjust_dataset_totals(connection, file.feature_model_id, 1, file.size)
+
+
 class HubfileViewRecord(db.Model):
     __tablename__ = 'file_view_record'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     file_id = db.Column(db.Integer, db.ForeignKey('file.id'), nullable=False)
-    view_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    view_date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
     view_cookie = db.Column(db.String(36))
+    # NULLs never collide in a unique index, so anonymous records are keyed on user 0
+    user_key = db.Column(db.Integer, db.Computed('coalesce(user_id, 0)', persisted=True))
+
+    __table_args__ = (
+        db.UniqueConstraint('user_key', 'file_id', 'view_cookie', name='uix_file_view_once'),
+        db.Index('ix_file_view_record_file_date', 'file_id', 'view_date'),
+    )
 
     def __repr__(self):
         return '<FileViewRecord {}>'.format(self.id)
@@ -64,8 +105,14 @@ class HubfileDownloadRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     file_id = db.Column(db.Integer, db.ForeignKey('file.id'))
-    download_date = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    download_date = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
     download_cookie = db.Column(db.String(36), nullable=False)
+    user_key = db.Column(db.Integer, db.Computed('coalesce(user_id, 0)', persisted=True))
+
+    __table_args__ = (
+        db.UniqueConstraint('user_key', 'file_id', 'download_cookie', name='uix_file_download_once'),
+        db.Index('ix_file_download_record_file_date', 'file_id', 'download_date'),
+    )
 
     def __repr__(self):
         return (
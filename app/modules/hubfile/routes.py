@@ -1,16 +1,39 @@
 from datetime import datetime, timezone
 import os
 import uuid
-from flask import current_app, jsonify, make_response, request, send_from_directory
+from flask import current_app, jsonify, make_response, request
 from flask_login import current_user
 
 from app.modules.auth.services import AuthenticationService
 from app.modules.bot.services import BotMessagingService
 from app.modules.hubfile import hubfile_bp
 from app.modules.hubfile.models import HubfileDownloadRecord, HubfileViewRecord
-from app.modules.hubfile.services import HubfileDownloadRecordService, HubfileService
+from app.modules.hubfile.services import HubfileService
+from core.responses.file_responses import send_from_directory
 
-from app import db
+from app import tracker
+
+# Files of a published dataset never change, so clients may keep them for a year
+PUBLISHED_FILE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def is_published(file) -> bool:
+    return file.feature_model.data_set.ds_meta_data.dataset_doi is not None
+
+
+def apply_cache_policy(response, file, published: bool, sets_cookie: bool):
+    """Strong validators from the stored checksum; published files are also immutable."""
+    response.set_etag(file.checksum)
+    if published:
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = PUBLISHED_FILE_MAX_AGE
+        response.cache_control.immutable = True
+        # A response carrying Set-Cookie must not end up in a shared cache
+        response.cache_control.public = None if sets_cookie else True
+        response.cache_control.private = True if sets_cookie else None
+    else:
+        response.cache_control.no_cache = True
+    return response
 
 
 @hubfile_bp.route("/file/download/<int:file_id>", methods=["GET"])
@@ -27,23 +50,23 @@ def download_file(file_id):
     if not user_cookie:
         user_cookie = str(uuid.uuid4())
 
-    # Check if the download record already exists for this cookie
-    existing_record = HubfileDownloadRecord.query.filter_by(
-        user_id=current_user.id if current_user.is_authenticated else None, file_id=file_id, download_cookie=user_cookie
-    ).first()
-
-    if not existing_record:
-        # Record the download in your database
-        HubfileDownloadRecordService().create(
-            user_id=current_user.id if current_user.is_authenticated else None,
-            file_id=file_id,
-            download_date=datetime.now(timezone.utc),
-            download_cookie=user_cookie,
-        )
+    # Record the download unless this cookie already did
+    tracker.track(
+        HubfileDownloadRecord,
+        user_id=current_user.id if current_user.is_authenticated else None,
+        file_id=file_id,
+        download_date=datetime.now(timezone.utc),
+        download_cookie=user_cookie,
+    )
 
     # Save the cookie to the user's browser
-    resp = make_response(send_from_directory(directory=file_path, path=filename, as_attachment=True))
-    resp.set_cookie("file_download_cookie", user_cookie)
+    sets_cookie = not request.cookies.get("file_download_cookie")
+    resp = make_response(
+        send_from_directory(directory=file_path, path=filename, as_attachment=True, etag=file.checksum)
+    )
+    if sets_cookie:
+        resp.set_cookie("file_download_cookie", user_cookie)
+    apply_cache_policy(resp, file, is_published(file), sets_cookie)
 
     auth_service = AuthenticationService()
     profile = auth_service.get_authenticated_user_profile()
@@ -63,36 +86,34 @@ def view_file(file_id):
 
     try:
         if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                content = f.read()
-
             user_cookie = request.cookies.get('view_cookie')
             if not user_cookie:
                 user_cookie = str(uuid.uuid4())
 
-            # Check if the view record already exists for this cookie
-            existing_record = HubfileViewRecord.query.filter_by(
+            # Register file view unless this cookie already did
+            tracker.track(
+                HubfileViewRecord,
                 user_id=current_user.id if current_user.is_authenticated else None,
                 file_id=file_id,
+                view_date=datetime.now(timezone.utc),
                 view_cookie=user_cookie,
-            ).first()
-
-            if not existing_record:
-                # Register file view
-                new_view_record = HubfileViewRecord(
-                    user_id=current_user.id if current_user.is_authenticated else None,
-                    file_id=file_id,
-                    view_date=datetime.now(),
-                    view_cookie=user_cookie,
-                )
-                db.session.add(new_view_record)
-                db.session.commit()
+            )
+
+            sets_cookie = not request.cookies.get('view_cookie')
+
+            # The client already holds this exact content, skip reading the file
+            if request.if_none_match.contains(file.checksum):
+                response = make_response('', 304)
+            else:
+                with open(file_path, 'r') as f:
+                    content = f.read()
+                response = make_response(jsonify({'success': True, 'content': content}))
 
             # Prepare response
-            response = jsonify({'success': True, 'content': content})
-            if not request.cookies.get('view_cookie'):
-                response = make_response(response)
+            if sets_cookie:
                 response.set_cookie('view_cookie', user_cookie, max_age=60 * 60 * 24 * 365 * 2)
+            response.last_modified = os.path.getmtime(file_path)
+            apply_cache_policy(response, file, is_published(file), sets_cookie)
 
             return response
         else:
@@ -1,4 +1,10 @@
+from unittest.mock import MagicMock
+
 import pytest
+from flask import Flask, Response
+
+from app.modules.hubfile.routes import PUBLISHED_FILE_MAX_AGE, apply_cache_policy
+from core.responses.file_responses import send_file, send_from_directory
 
 
 @pytest.fixture(scope="module")
@@ -22,3 +28,81 @@ def test_sample_assertion(test_client):
     """
     greeting = "Hello, World!"
     assert greeting == "Hello, World!", "The greeting does not coincide with 'Hello, World!'"
+
+
+@pytest.fixture
+def accel_app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        X_ACCEL_REDIRECT=True,
+        X_ACCEL_REDIRECT_ROOT=str(tmp_path / 'uploads'),
+        X_ACCEL_REDIRECT_LOCATION='/internal/uploads/',
+    )
+    (tmp_path / 'uploads' / 'user_1' / 'dataset_2').mkdir(parents=True)
+    (tmp_path / 'uploads' / 'user_1' / 'dataset_2' / 'file 1.uvl').write_text('features')
+    (tmp_path / 'outside.uvl').write_text('features')
+    return app
+
+
+def test_send_from_directory_hands_uploads_over_to_nginx(accel_app, tmp_path):
+    directory = tmp_path / 'uploads' / 'user_1' / 'dataset_2'
+    with accel_app.test_request_context():
+        response = send_from_directory(directory=directory, path='file 1.uvl', as_attachment=True)
+
+    assert response.headers['X-Accel-Redirect'] == '/internal/uploads/user_1/dataset_2/file%201.uvl'
+    assert response.headers['Content-Disposition'] == 'attachment; filename="file 1.uvl"'
+    assert response.get_data() == b''
+
+
+def test_send_from_directory_serves_files_itself_when_disabled(accel_app, tmp_path):
+    accel_app.config['X_ACCEL_REDIRECT'] = False
+    directory = tmp_path / 'uploads' / 'user_1' / 'dataset_2'
+    with accel_app.test_request_context():
+        response = send_from_directory(directory=directory, path='file 1.uvl', as_attachment=True)
+        response.direct_passthrough = False
+
+        assert 'X-Accel-Redirect' not in response.headers
+        assert response.get_data() == b'features'
+
+
+def test_send_file_never_redirects_outside_the_uploads_root(accel_app, tmp_path):
+    with accel_app.test_request_context():
+        response = send_file(str(tmp_path / 'outside.uvl'))
+        response.direct_passthrough = False
+
+        assert 'X-Accel-Redirect' not in response.headers
+        assert response.get_data() == b'features'
+
+
+def test_send_file_answers_revalidation_without_redirect(accel_app, tmp_path):
+    path = str(tmp_path / 'uploads' / 'user_1' / 'dataset_2' / 'file 1.uvl')
+    with accel_app.test_request_context(headers={'If-None-Match': '"abc123"'}):
+        response = send_file(path, etag='abc123')
+
+    assert response.status_code == 304
+    assert 'X-Accel-Redirect' not in response.headers
+
+    with accel_app.test_request_context(headers={'If-None-Match': '"stale"'}):
+        response = send_file(path, etag='abc123')
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] == '"abc123"'
+    assert response.headers['Last-Modified']
+    assert 'X-Accel-Redirect' in response.headers
+
+
+def test_published_files_are_cached_as_immutable():
+    file = MagicMock(checksum='abc123')
+
+    response = apply_cache_policy(Response(), file, published=True, sets_cookie=False)
+    assert response.headers['ETag'] == '"abc123"'
+    assert response.cache_control.public
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == PUBLISHED_FILE_MAX_AGE
+
+    response = apply_cache_policy(Response(), file, published=True, sets_cookie=True)
+    assert response.cache_control.private and not response.cache_control.public
+
+    response = apply_cache_policy(Response(), file, published=False, sets_cookie=False)
+    assert response.cache_control.no_cache
+    assert response.cache_control.max_age is None
@@ -2,6 +2,7 @@ from flask import abort, redirect, render_template, request, url_for
 from app.modules.auth.models import User
 from app.modules.auth.services import AuthenticationService
 from app.modules.dataset.models import DataSet
+from app.modules.dataset.services import DataSetService
 from flask_login import login_required, current_user
 
 from app import db
@@ -35,12 +36,7 @@ def my_profile():
     page = request.args.get('page', 1, type=int)
     per_page = 5
 
-    user_datasets_pagination = (
-        db.session.query(DataSet)
-        .filter(DataSet.user_id == current_user.id)
-        .order_by(DataSet.created_at.desc())
-        .paginate(page=page, per_page=per_page, error_out=False)
-    )
+    user_datasets_pagination = DataSetService().paginate_by_user(current_user.id, page, per_page)
 
     total_datasets_count = db.session.query(DataSet).filter(DataSet.user_id == current_user.id).count()
 
@@ -70,12 +66,7 @@ def user_profile(user_id):
         abort(404)  # Retorna un error 404 si el usuario no existe
 
     # Obtener los datasets del usuario
-    user_datasets_pagination = (
-        db.session.query(DataSet)
-        .filter(DataSet.user_id == user_id)
-        .order_by(DataSet.created_at.desc())
-        .paginate(page=page, per_page=per_page, error_out=False)
-    )
+    user_datasets_pagination = DataSetService().paginate_by_user(user_id, page, per_page)
 
     total_datasets_count = db.session.query(DataSet).filter(DataSet.user_id == user_id).count()
 
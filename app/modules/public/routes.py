@@ -2,9 +2,17 @@ import logging
 
 from flask import render_template
 
-from app.modules.featuremodel.services import FeatureModelService
 from app.modules.public import public_bp
 from app.modules.dataset.services import DataSetService
+from app.modules.statistics.services import (
+    DATASET_DOWNLOADS,
+    DATASET_VIEWS,
+    DATASETS,
+    FEATURE_MODEL_DOWNLOADS,
+    FEATURE_MODEL_VIEWS,
+    FEATURE_MODELS,
+    StatisticsService,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -13,27 +21,15 @@ logger = logging.getLogger(__name__)
 def index():
     logger.info("Access index")
     dataset_service = DataSetService()
-    feature_model_service = FeatureModelService()
-
-    # Statistics: total datasets and feature models
-    datasets_counter = dataset_service.count_synchronized_datasets()
-    feature_models_counter = feature_model_service.count_feature_models()
-
-    # Statistics: total downloads
-    total_dataset_downloads = dataset_service.total_dataset_downloads()
-    total_feature_model_downloads = feature_model_service.total_feature_model_downloads()
-
-    # Statistics: total views
-    total_dataset_views = dataset_service.total_dataset_views()
-    total_feature_model_views = feature_model_service.total_feature_model_views()
+    counters = StatisticsService().get_counters()
 
     return render_template(
         "public/index.html",
         datasets=dataset_service.latest_synchronized(),
-        datasets_counter=datasets_counter,
-        feature_models_counter=feature_models_counter,
-        total_dataset_downloads=total_dataset_downloads,
-        total_feature_model_downloads=total_feature_model_downloads,
-        total_dataset_views=total_dataset_views,
-        total_feature_model_views=total_feature_model_views,
+        datasets_counter=counters[DATASETS],
+        feature_models_counter=counters[FEATURE_MODELS],
+        total_dataset_downloads=counters[DATASET_DOWNLOADS],
+        total_feature_model_downloads=counters[FEATURE_MODEL_DOWNLOADS],
+        total_dataset_views=counters[DATASET_VIEWS],
+        total_feature_model_views=counters[FEATURE_MODEL_VIEWS],
     )
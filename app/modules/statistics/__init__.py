@@ -0,0 +1,15 @@
+from app import tracker
+from core.blueprints.base_blueprint import BaseBlueprint
+
+statistics_bp = BaseBlueprint('statistics', __name__, template_folder='templates')
+
+
+def count_recorded(model, rows, inserted):
+    from app.modules.statistics.services import StatisticsService, VisitorSketchService
+
+    StatisticsService().count_recorded(model, inserted)
+    VisitorSketchService().add_visitors(model, rows)
+
+
+# View and download counters move in the same transaction that writes the records
+tracker.on_recorded(count_recorded)
@@ -0,0 +1,49 @@
+from app import db
+
+
+class Statistic(db.Model):
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'Statistic<{self.name}={self.value}>'
+
+
+class DailyStatistic(db.Model):
+    """Views or downloads of one dataset or file on one day, rolled up from the record tables."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)
+    target_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('kind', 'target_id', 'day', name='uix_daily_statistic'),)
+
+    def __repr__(self):
+        return f'DailyStatistic<{self.kind} {self.target_id} {self.day}={self.value}>'
+
+
+class DailyStatisticWatermark(db.Model):
+    """Last day of each kind whose records are fully rolled up into DailyStatistic."""
+
+    kind = db.Column(db.String(32), primary_key=True)
+    day = db.Column(db.Date)
+
+    def __repr__(self):
+        return f'DailyStatisticWatermark<{self.kind}={self.day}>'
+
+
+class VisitorSketch(db.Model):
+    """HyperLogLog sketch of the distinct visitors of one dataset or file on one day."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)
+    target_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    registers = db.Column(db.LargeBinary, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('kind', 'target_id', 'day', name='uix_visitor_sketch'),)
+
+    def __repr__(self):
+        return f'VisitorSketch<{self.kind} {self.target_id} {self.day}>'
@@ -0,0 +1,121 @@
+from datetime import date, datetime, time
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, insert, literal, select, update
+
+from app.modules.statistics.models import DailyStatistic, DailyStatisticWatermark, Statistic, VisitorSketch
+from core.sketches.hyperloglog import HyperLogLog
+from core.repositories.BaseRepository import BaseRepository
+
+
+class StatisticRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(Statistic)
+
+    def increment(self, name: str, delta: int = 1, commit: bool = True):
+        statement = update(Statistic).where(Statistic.name == name).values(value=Statistic.value + delta)
+        if not self.session.execute(statement).rowcount:
+            # First event of a counter that is not in the table yet
+            self.record_once(commit=False, name=name, value=0)
+            self.session.execute(statement)
+        if commit:
+            self.session.commit()
+
+    def get_value(self, name: str) -> int:
+        return self.session.query(Statistic.value).filter(Statistic.name == name).scalar() or 0
+
+    def get_values(self) -> Dict[str, int]:
+        return dict(self.session.query(Statistic.name, Statistic.value).all())
+
+    def set_values(self, values: Dict[str, int]):
+        for name, value in values.items():
+            self.session.merge(Statistic(name=name, value=value))
+        self.session.commit()
+
+
+def as_date(value) -> date:
+    # DATE() comes back as a string on SQLite
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+class DailyStatisticRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(DailyStatistic)
+
+    def lock_watermark(self, kind: str) -> DailyStatisticWatermark:
+        BaseRepository(DailyStatisticWatermark).record_once(commit=False, kind=kind)
+        return self.session.query(DailyStatisticWatermark).filter_by(kind=kind).with_for_update().one()
+
+    def get_watermark(self, kind: str) -> Optional[date]:
+        """Last day rolled up for kind, without locking it."""
+        return self.session.query(DailyStatisticWatermark.day).filter_by(kind=kind).scalar()
+
+    def first_record_day(self, date_column) -> Optional[date]:
+        first = self.session.query(func.min(date_column)).scalar()
+        return first.date() if first else None
+
+    def roll_up(self, kind: str, target_column, date_column, start: date, end: date):
+        """Adds one row per target and day with the number of records dated in [start, end)."""
+        day = func.date(date_column)
+        daily_counts = (
+            select(day, literal(kind), target_column, func.count())
+            .where(
+                date_column >= datetime.combine(start, time.min),
+                date_column < datetime.combine(end, time.min),
+                target_column.isnot(None),
+            )
+            .group_by(day, target_column)
+        )
+        self.session.execute(insert(DailyStatistic).from_select(['day', 'kind', 'target_id', 'value'], daily_counts))
+
+    def delete_records(self, model, date_column, before: date) -> int:
+        statement = delete(model).where(date_column < datetime.combine(before, time.min))
+        return self.session.execute(statement).rowcount
+
+    def get_series(self, kind: str, target_id: int, start: date, end: date) -> Dict[date, int]:
+        rows = self.session.query(DailyStatistic.day, DailyStatistic.value).filter(
+            DailyStatistic.kind == kind,
+            DailyStatistic.target_id == target_id,
+            DailyStatistic.day >= start,
+            DailyStatistic.day <= end,
+        )
+        return {as_date(day): value for day, value in rows}
+
+    def count_records(self, target_column, date_column, target_id: int, start: date, end: date) -> Dict[date, int]:
+        """Per-day counts of the records of one target dated in [start, end), read from the record table."""
+        day = func.date(date_column)
+        rows = (
+            self.session.query(day, func.count())
+            .filter(
+                target_column == target_id,
+                date_column >= datetime.combine(start, time.min),
+                date_column < datetime.combine(end, time.min),
+            )
+            .group_by(day)
+        )
+        return {as_date(day): count for day, count in rows}
+
+
+class VisitorSketchRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(VisitorSketch)
+
+    def merge(self, kind: str, target_id: int, day: date, sketch: HyperLogLog):
+        """Merges sketch into the stored one, holding a row lock so concurrent flushes cannot lose registers."""
+        empty = HyperLogLog(sketch.precision).to_bytes()
+        self.record_once(commit=False, kind=kind, target_id=target_id, day=day, registers=empty)
+        stored = (
+            self.session.query(VisitorSketch).filter_by(kind=kind, target_id=target_id, day=day).with_for_update().one()
+        )
+        merged = HyperLogLog.from_bytes(stored.registers)
+        merged.merge(sketch)
+        stored.registers = merged.to_bytes()
+
+    def get_sketches(self, kind: str, target_id: int, start: date, end: date) -> Dict[date, HyperLogLog]:
+        rows = self.session.query(VisitorSketch.day, VisitorSketch.registers).filter(
+            VisitorSketch.kind == kind,
+            VisitorSketch.target_id == target_id,
+            VisitorSketch.day >= start,
+            VisitorSketch.day <= end,
+        )
+        return {as_date(day): HyperLogLog.from_bytes(registers) for day, registers in rows}
@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+from flask import abort, jsonify, request
+from flask_login import current_user
+
+from app.modules.dataset.services import DataSetService
+from app.modules.hubfile.services import HubfileService
+from app.modules.statistics import statistics_bp
+from app.modules.statistics.services import MAX_SERIES_DAYS, DailyStatisticsService, StatisticsService
+
+
+@statistics_bp.route('/statistics', methods=['GET'])
+def index():
+    return jsonify(StatisticsService().get_counters())
+
+
+def check_visible(dataset):
+    """Daily statistics are public for published datasets and visible to the owner before that."""
+    if dataset.ds_meta_data.dataset_doi is None and not (
+        current_user.is_authenticated and current_user.id == dataset.user_id
+    ):
+        abort(404)
+
+
+def daily_series(target: str, target_id: int):
+    try:
+        end = date.fromisoformat(request.args['end']) if 'end' in request.args else date.today()
+        start = date.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=29)
+    except ValueError:
+        return jsonify({'error': 'start and end must be dates in YYYY-MM-DD format'}), 400
+    if start > end or (end - start).days >= MAX_SERIES_DAYS:
+        return jsonify({'error': f'The range must span between 1 and {MAX_SERIES_DAYS} days'}), 400
+
+    series = DailyStatisticsService().get_series(target, target_id, start, end)
+    return jsonify({f'{target}_id': target_id, 'start': start.isoformat(), 'end': end.isoformat(), **series})
+
+
+@statistics_bp.route('/statistics/datasets/<int:dataset_id>/daily', methods=['GET'])
+def dataset_daily(dataset_id):
+    check_visible(DataSetService().get_or_404(dataset_id))
+    return daily_series('dataset', dataset_id)
+
+
+@statistics_bp.route('/statistics/files/<int:file_id>/daily', methods=['GET'])
+def file_daily(file_id):
+    check_visible(HubfileService().get_or_404(file_id).feature_model.data_set)
+    return daily_series('file', file_id)
@@ -0,0 +1,10 @@
+from app.modules.statistics.services import StatisticsService
+from core.seeders.BaseSeeder import BaseSeeder
+
+
+class StatisticsSeeder(BaseSeeder):
+    # Runs after every other seeder, so the counters match the seeded records
+    priority = 100
+
+    def run(self):
+        StatisticsService().rebuild()
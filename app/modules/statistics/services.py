@@ -0,0 +1,249 @@
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List
+
+from flask import current_app
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session, object_session
+
+from app.modules.dataset.models import DataSet, DSDownloadRecord, DSMetaData, DSViewRecord
+from app.modules.featuremodel.models import FeatureModel
+from app.modules.hubfile.models import HubfileDownloadRecord, HubfileViewRecord
+from app.modules.statistics.models import Statistic
+from app.modules.statistics.repositories import (
+    DailyStatisticRepository,
+    StatisticRepository,
+    VisitorSketchRepository,
+)
+from core.sketches.hyperloglog import HyperLogLog
+from core.services.BaseService import BaseService
+
+DATASETS = 'datasets'
+FEATURE_MODELS = 'feature_models'
+DATASET_DOWNLOADS = 'dataset_downloads'
+DATASET_VIEWS = 'dataset_views'
+FEATURE_MODEL_DOWNLOADS = 'feature_model_downloads'
+FEATURE_MODEL_VIEWS = 'feature_model_views'
+
+RECORD_COUNTERS = {
+    DSDownloadRecord: DATASET_DOWNLOADS,
+    DSViewRecord: DATASET_VIEWS,
+    HubfileDownloadRecord: FEATURE_MODEL_DOWNLOADS,
+    HubfileViewRecord: FEATURE_MODEL_VIEWS,
+}
+
+# Kind of daily statistic -> (target column, date column) of the record table it is rolled up from
+DAILY_KINDS = {
+    'dataset_views': (DSViewRecord.dataset_id, DSViewRecord.view_date),
+    'dataset_downloads': (DSDownloadRecord.dataset_id, DSDownloadRecord.download_date),
+    'file_views': (HubfileViewRecord.file_id, HubfileViewRecord.view_date),
+    'file_downloads': (HubfileDownloadRecord.file_id, HubfileDownloadRecord.download_date),
+}
+# Record model -> (kind, cookie field) of the visitor sketches it feeds
+SKETCHED_RECORDS = {
+    DSViewRecord: ('dataset_views', 'view_cookie'),
+    DSDownloadRecord: ('dataset_downloads', 'download_cookie'),
+    HubfileViewRecord: ('file_views', 'view_cookie'),
+    HubfileDownloadRecord: ('file_downloads', 'download_cookie'),
+}
+SKETCH_PRECISION = 12
+# Records reach the database a few seconds late, so a day is only rolled up once it is well over
+ROLLUP_DELAY = timedelta(hours=1)
+MAX_SERIES_DAYS = 366
+
+_cache = {'values': None, 'expires': 0.0}
+_cache_lock = threading.Lock()
+# Session.info flag: counters changed in the current transaction, drop the cache once it commits
+COUNTERS_CHANGED = 'statistics_counters_changed'
+
+
+def invalidate_cache():
+    with _cache_lock:
+        _cache['values'] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_cache_after_commit(session):
+    if session.info.pop(COUNTERS_CHANGED, False):
+        invalidate_cache()
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_rolled_back_counters(session):
+    session.info.pop(COUNTERS_CHANGED, None)
+
+
+def adjust_counter(connection, session, name: str, delta: int):
+    """Adds delta to a counter from inside a flush, in the transaction that changes the counted rows."""
+    connection.execute(update(Statistic).where(Statistic.name == name).values(value=Statistic.value + delta))
+    if session is not None:
+        session.info[COUNTERS_CHANGED] = True
+
+
+@event.listens_for(DataSet, 'before_delete')
+def count_deleted_dataset(mapper, connection, dataset):
+    doi = connection.execute(select(DSMetaData.dataset_doi).where(DSMetaData.id == dataset.ds_meta_data_id)).scalar()
+    if doi is not None:
+        adjust_counter(connection, object_session(dataset), DATASETS, -1)
+
+
+@event.listens_for(FeatureModel, 'after_delete')
+def count_deleted_feature_model(mapper, connection, feature_model):
+    adjust_counter(connection, object_session(feature_model), FEATURE_MODELS, -1)
+
+
+class StatisticsService(BaseService):
+    def __init__(self):
+        super().__init__(StatisticRepository())
+
+    def increment(self, name: str, delta: int = 1, commit: bool = True):
+        self.repository.session.info[COUNTERS_CHANGED] = True
+        self.repository.increment(name, delta, commit=commit)
+
+    def get_value(self, name: str) -> int:
+        """Uncached read of a single counter."""
+        return self.repository.get_value(name)
+
+    def count_recorded(self, model, count: int):
+        name = RECORD_COUNTERS.get(model)
+        if name and count:
+            self.increment(name, count, commit=False)
+
+    def get_counters(self) -> Dict[str, int]:
+        """Every counter from one read of the rollup table, kept for STATISTICS_CACHE_TTL seconds."""
+        now = time.monotonic()
+        with _cache_lock:
+            if _cache['values'] is not None and now < _cache['expires']:
+                return _cache['values']
+
+        values = dict.fromkeys((DATASETS, FEATURE_MODELS, *RECORD_COUNTERS.values()), 0)
+        values.update((name, value) for name, value in self.repository.get_values().items() if name in values)
+        with _cache_lock:
+            _cache['values'] = values
+            _cache['expires'] = now + current_app.config.get('STATISTICS_CACHE_TTL', 0)
+        return values
+
+    def invalidate_cache(self):
+        invalidate_cache()
+
+    def rebuild(self) -> Dict[str, int]:
+        """Recounts every counter from the source tables, e.g. after seeding or a manual cleanup."""
+        session = self.repository.session
+        values = {
+            DATASETS: session.query(DataSet).join(DSMetaData).filter(DSMetaData.dataset_doi.isnot(None)).count(),
+            FEATURE_MODELS: session.query(FeatureModel).count(),
+        }
+        for model, name in RECORD_COUNTERS.items():
+            values[name] = session.query(model).count()
+        self.repository.set_values(values)
+        self.invalidate_cache()
+        return values
+
+
+class DailyStatisticsService(BaseService):
+    def __init__(self):
+        super().__init__(DailyStatisticRepository())
+
+    def roll_up(self, kinds: List[str] = None, now: datetime = None) -> Dict[str, date]:
+        """
+        Aggregates every closed day that is not in the daily table yet and returns, per kind,
+        the last day rolled up. Cheap when there is nothing to do. It locks the watermarks and
+        deletes expired records, so it runs from 'rosemary statistics:rollup', never per request.
+        """
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        end = (now - ROLLUP_DELAY).date()
+        last_closed_day = end - timedelta(days=1)
+        rolled_up_until = {}
+        for kind in kinds or DAILY_KINDS:
+            target_column, date_column = DAILY_KINDS[kind]
+            watermark = self.repository.lock_watermark(kind)
+            if watermark.day is None:
+                start = self.repository.first_record_day(date_column) or end
+            else:
+                start = watermark.day + timedelta(days=1)
+            if start < end:
+                self.repository.roll_up(kind, target_column, date_column, start, end)
+            watermark.day = max(watermark.day or last_closed_day, last_closed_day)
+            rolled_up_until[kind] = watermark.day
+
+            retention_days = current_app.config.get('STATISTICS_RECORD_RETENTION_DAYS')
+            if retention_days:
+                # Only days already in the daily table may go
+                before = min(end, now.date() - timedelta(days=retention_days))
+                self.repository.delete_records(date_column.class_, date_column, before)
+            self.repository.session.commit()
+        return rolled_up_until
+
+    def get_series(self, target: str, target_id: int, start: date, end: date) -> Dict[str, List[dict]]:
+        """
+        Daily views and downloads of a dataset or file between start and end, both included.
+        Read-only: days rolled up come from the daily table, later ones from the records.
+        """
+        metrics = {'views': f'{target}_views', 'downloads': f'{target}_downloads'}
+        series = {}
+        for metric, kind in metrics.items():
+            target_column, date_column = DAILY_KINDS[kind]
+            counts = self.repository.get_series(kind, target_id, start, end)
+
+            # Days after the watermark are still open and are counted straight from the records
+            rolled_up_until = self.repository.get_watermark(kind)
+            live_start = max(start, rolled_up_until + timedelta(days=1)) if rolled_up_until else start
+            if live_start <= end:
+                counts.update(
+                    self.repository.count_records(
+                        target_column, date_column, target_id, live_start, end + timedelta(days=1)
+                    )
+                )
+
+            series[metric] = [{'date': day.isoformat(), 'count': counts.get(day, 0)} for day in date_range(start, end)]
+
+        if current_app.config.get('STATISTICS_VISITOR_SKETCHES'):
+            series.update(VisitorSketchService().get_visitors(metrics['views'], target_id, start, end))
+        return series
+
+
+def date_range(start: date, end: date):
+    return (start + timedelta(days=offset) for offset in range((end - start).days + 1))
+
+
+class VisitorSketchService(BaseService):
+    """
+    Optional distinct-visitor counting. With STATISTICS_VISITOR_SKETCHES enabled every tracked
+    record also feeds a per-day HyperLogLog sketch, so unique visitors stay answerable in
+    constant space even once the raw records expire (STATISTICS_RECORD_RETENTION_DAYS).
+    """
+
+    def __init__(self):
+        super().__init__(VisitorSketchRepository())
+
+    def add_visitors(self, model, rows: List[dict]):
+        if not current_app.config.get('STATISTICS_VISITOR_SKETCHES') or model not in SKETCHED_RECORDS:
+            return
+        kind, cookie_field = SKETCHED_RECORDS[model]
+        target_column, date_column = DAILY_KINDS[kind]
+
+        sketches = {}
+        for row in rows:
+            recorded_at = row.get(date_column.key) or datetime.now(timezone.utc)
+            key = (row[target_column.key], recorded_at.date())
+            visitor = f"user:{row['user_id']}" if row.get('user_id') else f"cookie:{row[cookie_field]}"
+            sketches.setdefault(key, HyperLogLog(SKETCH_PRECISION)).add(visitor)
+
+        # Rows are locked in key order so that concurrent flushes cannot deadlock on each other
+        for target_id, day in sorted(sketches):
+            self.repository.merge(kind, target_id, day, sketches[(target_id, day)])
+
+    def get_visitors(self, kind: str, target_id: int, start: date, end: date) -> dict:
+        """Estimated distinct visitors per day and over the whole range."""
+        sketches = self.repository.get_sketches(kind, target_id, start, end)
+        total = HyperLogLog(SKETCH_PRECISION)
+        for sketch in sketches.values():
+            total.merge(sketch)
+        return {
+            'visitors': [
+                {'date': day.isoformat(), 'count': sketches[day].count() if day in sketches else 0}
+                for day in date_range(start, end)
+            ],
+            'unique_visitors': total.count(),
+        }
@@ -0,0 +1,227 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app import db, tracker
+from app.modules.auth.models import User
+from app.modules.dataset.models import DataSet, DSMetaData, DSViewRecord, PublicationType
+from app.modules.dataset.services import DataSetService
+from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from app.modules.statistics.models import DailyStatistic
+from app.modules.statistics.services import (
+    DATASET_VIEWS,
+    DATASETS,
+    FEATURE_MODELS,
+    DailyStatisticsService,
+    StatisticsService,
+    VisitorSketchService,
+)
+from core.sketches.hyperloglog import HyperLogLog
+
+
+@pytest.fixture(scope='module')
+def test_client(test_client):
+    """
+    Extends the test_client fixture to add additional specific data for module testing.
+    """
+    with test_client.application.app_context():
+        ds_meta_data = DSMetaData(title='Counted', description='Counted', publication_type=PublicationType.NONE)
+        db.session.add(ds_meta_data)
+        db.session.commit()
+        db.session.add(DataSet(user_id=User.query.first().id, ds_meta_data_id=ds_meta_data.id))
+        db.session.commit()
+
+    yield test_client
+
+
+def test_counters_follow_tracked_records(test_client):
+    statistics_service = StatisticsService()
+    dataset = DataSet.query.first()
+    before = statistics_service.get_counters()[DATASET_VIEWS]
+
+    for cookie in ('cookie-1', 'cookie-1', 'cookie-2'):
+        tracker.track(DSViewRecord, user_id=None, dataset_id=dataset.id, view_date=datetime.now(), view_cookie=cookie)
+
+    assert statistics_service.get_counters()[DATASET_VIEWS] == before + 2
+
+
+def test_counters_follow_publication(test_client):
+    statistics_service = StatisticsService()
+    dataset = DataSet.query.first()
+    before = statistics_service.get_counters()[DATASETS]
+
+    DataSetService().update_dsmetadata(dataset.ds_meta_data_id, dataset_doi='10.1234/counted')
+    assert statistics_service.get_counters()[DATASETS] == before + 1
+
+    DataSetService().update_dsmetadata(dataset.ds_meta_data_id, dataset_doi=None)
+    assert statistics_service.get_counters()[DATASETS] == before
+
+
+def test_counters_follow_deletions_once_committed(test_client, monkeypatch):
+    monkeypatch.setitem(test_client.application.config, 'STATISTICS_CACHE_TTL', 60)
+    statistics_service = StatisticsService()
+    ds_meta_data = DSMetaData(
+        title='Deleted', description='Deleted', publication_type=PublicationType.NONE, dataset_doi='10.1234/deleted'
+    )
+    fm_meta_data = FMMetaData(uvl_filename='a.uvl', title='A', description='', publication_type=PublicationType.NONE)
+    db.session.add(ds_meta_data)
+    db.session.commit()
+    dataset = DataSet(
+        user_id=User.query.first().id,
+        ds_meta_data_id=ds_meta_data.id,
+        feature_models=[FeatureModel(fm_meta_data=fm_meta_data)],
+    )
+    db.session.add(dataset)
+    db.session.commit()
+    statistics_service.increment(DATASETS)
+    statistics_service.increment(FEATURE_MODELS)
+    before = statistics_service.get_counters()
+
+    statistics_service.increment(DATASETS, commit=False)
+    assert statistics_service.get_counters() == before
+    db.session.rollback()
+
+    DataSetService().delete(dataset.id)
+
+    counters = statistics_service.get_counters()
+    assert counters[DATASETS] == before[DATASETS] - 1
+    assert counters[FEATURE_MODELS] == before[FEATURE_MODELS] - 1
+
+
+def test_rebuild_recounts_from_the_records(test_client):
+    statistics_service = StatisticsService()
+    statistics_service.increment(DATASET_VIEWS, 40)
+
+    counters = statistics_service.rebuild()
+
+    assert counters[DATASET_VIEWS] == DSViewRecord.query.count()
+    assert statistics_service.get_counters()[DATASET_VIEWS] == DSViewRecord.query.count()
+
+
+def test_index_serves_the_counters(test_client):
+    response = test_client.get('/statistics')
+
+    assert response.status_code == 200
+    assert response.json == StatisticsService().get_counters()
+
+
+def test_landing_page_reads_the_counters(test_client):
+    counters = StatisticsService().get_counters()
+
+    response = test_client.get('/')
+
+    assert response.status_code == 200
+    assert f'{counters[DATASETS]} datasets' in response.get_data(as_text=True)
+
+
+def test_daily_series_combines_rolled_up_and_open_days(test_client):
+    ds_meta_data = DSMetaData(
+        title='Trending', description='Trending', publication_type=PublicationType.NONE, dataset_doi='10.1234/trending'
+    )
+    db.session.add(ds_meta_data)
+    db.session.commit()
+    dataset = DataSet(user_id=User.query.first().id, ds_meta_data_id=ds_meta_data.id)
+    db.session.add(dataset)
+    db.session.commit()
+    today = date.today()
+    for days_ago, cookie in [(3, 'daily-1'), (3, 'daily-2'), (1, 'daily-3'), (0, 'daily-4')]:
+        tracker.track(
+            DSViewRecord,
+            user_id=None,
+            dataset_id=dataset.id,
+            view_date=datetime.combine(today - timedelta(days=days_ago), time(12)),
+            view_cookie=cookie,
+        )
+
+    # Everything up to two days ago is closed and goes to the daily table
+    DailyStatisticsService().roll_up(now=datetime.combine(today - timedelta(days=1), time(12)))
+    assert DailyStatistic.query.filter_by(kind='dataset_views', target_id=dataset.id).count() == 1
+
+    response = test_client.get(f'/statistics/datasets/{dataset.id}/daily?start={today - timedelta(days=3)}&end={today}')
+
+    assert response.status_code == 200
+    assert [day['count'] for day in response.json['views']] == [2, 0, 1, 1]
+    assert [day['count'] for day in response.json['downloads']] == [0, 0, 0, 0]
+
+
+def test_daily_series_never_rolls_up(test_client):
+    dataset = DataSet.query.filter(DataSet.ds_meta_data.has(dataset_doi='10.1234/trending')).one()
+    rolled_up = DailyStatistic.query.count()
+    tracker.track(
+        DSViewRecord,
+        user_id=None,
+        dataset_id=dataset.id,
+        view_date=datetime.combine(date.today() - timedelta(days=5), time(12)),
+        view_cookie='read-only',
+    )
+
+    response = test_client.get(f'/statistics/datasets/{dataset.id}/daily')
+
+    assert response.status_code == 200
+    assert DailyStatistic.query.count() == rolled_up
+
+
+def test_daily_series_of_unpublished_datasets_is_only_visible_to_the_owner(test_client):
+    dataset = DataSet.query.first()
+    assert dataset.ds_meta_data.dataset_doi is None
+
+    assert test_client.get(f'/statistics/datasets/{dataset.id}/daily').status_code == 404
+
+    test_client.post('/login', data=dict(email='test@example.com', password='test1234'))
+    try:
+        assert test_client.get(f'/statistics/datasets/{dataset.id}/daily').status_code == 200
+    finally:
+        test_client.get('/logout')
+
+
+def test_daily_series_rejects_invalid_ranges(test_client):
+    dataset = DataSet.query.filter(DataSet.ds_meta_data.has(dataset_doi='10.1234/trending')).one()
+
+    assert test_client.get(f'/statistics/datasets/{dataset.id}/daily?start=yesterday').status_code == 400
+    assert (
+        test_client.get(f'/statistics/datasets/{dataset.id}/daily?start=2024-01-01&end=2025-06-01').status_code == 400
+    )
+    assert test_client.get('/statistics/files/9999/daily').status_code == 404
+
+
+def test_hyperloglog_estimates_and_merges_distinct_counts():
+    first, second = HyperLogLog(), HyperLogLog()
+    first.update(f'visitor-{i}' for i in range(20000))
+    second.update(f'visitor-{i}' for i in range(10000, 30000))
+    first.update(f'visitor-{i}' for i in range(100))
+
+    assert abs(first.count() - 20000) < 20000 * 0.05
+    first.merge(second)
+    assert abs(first.count() - 30000) < 30000 * 0.05
+    assert HyperLogLog.from_bytes(first.to_bytes()).count() == first.count()
+
+
+def test_visitor_sketches_count_distinct_visitors(test_client, monkeypatch):
+    monkeypatch.setitem(test_client.application.config, 'STATISTICS_VISITOR_SKETCHES', True)
+    dataset = DataSet.query.filter(DataSet.ds_meta_data.has(dataset_doi='10.1234/trending')).one()
+    today = date.today()
+    for cookie in ('sketch-1', 'sketch-2', 'sketch-2', 'sketch-3'):
+        tracker.track(DSViewRecord, user_id=None, dataset_id=dataset.id, view_date=datetime.now(), view_cookie=cookie)
+
+    response = test_client.get(f'/statistics/datasets/{dataset.id}/daily?start={today}&end={today}')
+
+    assert response.json['unique_visitors'] == 3
+    assert response.json['visitors'] == [{'date': today.isoformat(), 'count': 3}]
+
+
+def test_visitor_sketches_are_merged_in_key_order(test_client, monkeypatch):
+    monkeypatch.setitem(test_client.application.config, 'STATISTICS_VISITOR_SKETCHES', True)
+    service = VisitorSketchService()
+    merged = []
+    monkeypatch.setattr(
+        service.repository, 'merge', lambda kind, target_id, day, sketch: merged.append((target_id, day))
+    )
+    today = datetime.now()
+    rows = [
+        dict(dataset_id=dataset_id, view_date=today - timedelta(days=days_ago), user_id=None, view_cookie='sorted')
+        for dataset_id, days_ago in [(3, 0), (1, 1), (3, 2), (1, 0)]
+    ]
+
+    service.add_visitors(DSViewRecord, rows)
+
+    assert merged == sorted(merged)
@@ -0,0 +1,143 @@
+import logging
+import os
+import tempfile
+import threading
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveCache:
+    """
+    Size-bounded on-disk cache of prebuilt archives.
+
+    Entries are named after a content key, so a key only ever maps to one archive.
+    Entries of the same group (the key up to its last ``-``, e.g. ``dataset_7-``) replace
+    each other, and the least recently served entries are evicted once the cache grows past
+    ``max_bytes``: every hit moves the entry's mtime forward.
+    """
+
+    SUFFIX = '.zip'
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.max_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directory = app.config.get('ARCHIVE_CACHE_DIR')
+        self.max_bytes = app.config.get('ARCHIVE_CACHE_MAX_BYTES', 0)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.max_bytes > 0
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}{self.SUFFIX}')
+
+    @staticmethod
+    def group_of(key: str) -> str:
+        return key[: key.rfind('-') + 1]
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        path = self.path_for(key)
+        try:
+            # Touching the entry keeps it at the head of the LRU order
+            os.utime(path)
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        except OSError as exc:
+            # e.g. written by another user: still servable, it just ages as if it was not served
+            logger.warning(f"Archive cache could not touch {path}: {exc}")
+
+        self._count('hits')
+        return path
+
+    def store(self, key: str, chunks: Iterable[bytes], group: str = None) -> Iterator[bytes]:
+        """
+        Passes `chunks` through while writing them to the cache. The entry only becomes
+        visible once the last chunk has been written, so an interrupted download never
+        leaves a truncated archive behind.
+        """
+        if group is not None and group != self.group_of(key):
+            raise ValueError(f"{key} is not in group {group}")
+        if not self.enabled:
+            yield from chunks
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in chunks:
+                    temp_file.write(chunk)
+                    yield chunk
+            os.replace(temp_path, self.path_for(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        if group:
+            self.invalidate(group, keep=key)
+        self.evict()
+
+    def invalidate(self, group: str, keep: str = None) -> int:
+        """Removes every entry of exactly `group`, except `keep`: ``dataset_1-`` never matches ``dataset_11-``."""
+        removed = 0
+        for entry in self._entries():
+            key = entry.name[: -len(self.SUFFIX)]
+            if self.group_of(key) == group and key != keep:
+                self._unlink(entry.path)
+                removed += 1
+        return removed
+
+    def evict(self) -> int:
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        total_size = sum(entry.stat().st_size for entry in entries)
+
+        evicted = 0
+        while entries and total_size > self.max_bytes:
+            entry = entries.pop(0)
+            total_size -= entry.stat().st_size
+            self._unlink(entry.path)
+            evicted += 1
+
+        if evicted:
+            self._count('evictions', evicted)
+            logger.info(f"Archive cache evicted {evicted} entries: {self.stats()}")
+        return evicted
+
+    def stats(self) -> dict:
+        entries = list(self._entries())
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'size_in_bytes': sum(entry.stat().st_size for entry in entries),
+            'max_size_in_bytes': self.max_bytes,
+        }
+
+    def _entries(self):
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith(self.SUFFIX)]
+
+    def _unlink(self, path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
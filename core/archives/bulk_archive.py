@@ -0,0 +1,109 @@
+import fcntl
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, Optional, Tuple
+from zipfile import ZipFile
+
+from core.archives.parallel_zip import write_files
+from core.archives.zip_stream import walk_files
+from core.archives.zip_writer import ZipWriter, raw_member_chunks
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalZipArchive:
+    """
+    A ZIP snapshot built from several source folders, each stored under its own top-level
+    directory (the group). A manifest next to the archive remembers the fingerprint every
+    group was built from, so a refresh only compresses the groups that are new or changed;
+    unchanged members are copied over from the previous snapshot byte for byte.
+    """
+
+    def __init__(self, path: str, max_workers: Optional[int] = None):
+        self.path = path
+        self.max_workers = max_workers
+        self.manifest_path = f'{path}.manifest.json'
+        self.lock_path = f'{path}.lock'
+
+    def load_manifest(self) -> Dict[str, str]:
+        try:
+            with open(self.manifest_path, 'r') as manifest:
+                return json.load(manifest)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def is_current(self, sources: Dict[str, Tuple[str, str]]) -> bool:
+        fingerprints = {group: fingerprint for group, (fingerprint, folder) in sources.items()}
+        return os.path.exists(self.path) and self.load_manifest() == fingerprints
+
+    def refresh(self, sources: Dict[str, Tuple[str, str]]) -> str:
+        """
+        Brings the snapshot in line with `sources`, a mapping of group -> (fingerprint, folder),
+        and returns its path. If another process is already refreshing, the current snapshot
+        is returned straight away.
+        """
+        if self.is_current(sources):
+            return self.path
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.lock_path, 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | (fcntl.LOCK_NB if os.path.exists(self.path) else 0))
+            except BlockingIOError:
+                return self.path
+
+            try:
+                if not self.is_current(sources):
+                    self._rebuild(sources)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        return self.path
+
+    def _rebuild(self, sources: Dict[str, Tuple[str, str]]):
+        previous = self.load_manifest() if os.path.exists(self.path) else {}
+        kept = {group for group, (fingerprint, folder) in sources.items() if previous.get(group) == fingerprint}
+        built = [group for group in sorted(sources) if group not in kept]
+
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+        try:
+            writer = ZipWriter()
+            with os.fdopen(fd, 'wb') as temp_file:
+                if kept:
+                    with open(self.path, 'rb') as snapshot_file, ZipFile(snapshot_file, 'r') as snapshot:
+                        for info in snapshot.infolist():
+                            if info.filename.split('/', 1)[0] in kept:
+                                temp_file.writelines(
+                                    writer.add_raw(
+                                        info.filename,
+                                        info.date_time,
+                                        info.external_attr,
+                                        info.compress_type,
+                                        info.CRC,
+                                        info.file_size,
+                                        raw_member_chunks(snapshot_file, info),
+                                    )
+                                )
+
+                entries = [entry for group in built for entry in walk_files(sources[group][1], arcroot=group)]
+                temp_file.writelines(write_files(writer, entries, max_workers=self.max_workers))
+                temp_file.writelines(writer.finish())
+
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        self._write_manifest({group: fingerprint for group, (fingerprint, folder) in sources.items()})
+        logger.info(
+            f"Bulk archive refreshed: {len(kept)} groups kept, {len(built)} rebuilt, "
+            f"{len(set(previous) - set(sources))} removed"
+        )
+
+    def _write_manifest(self, manifest: Dict[str, str]):
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.manifest_path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as temp_file:
+            json.dump(manifest, temp_file)
+        os.replace(temp_path, self.manifest_path)
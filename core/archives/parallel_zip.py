@@ -0,0 +1,94 @@
+import os
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple
+from zipfile import ZIP_DEFLATED
+
+from core.archives.zip_writer import CHUNK_SIZE, Deflater, ZipWriter
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def compression_pool(max_workers: Optional[int] = None) -> ThreadPoolExecutor:
+    """
+    The thread pool every archive build compresses on. It is created on first use with
+    `max_workers` threads and shared afterwards, so concurrent builds queue on the same
+    bounded set of threads instead of each starting their own.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1, thread_name_prefix='deflate')
+        return _pool
+
+
+class DeflatedFile:
+    """A file deflated into a spooled temporary file: in memory up to CHUNK_SIZE, on disk beyond."""
+
+    def __init__(self, full_path: str, level: int = zlib.Z_DEFAULT_COMPRESSION):
+        stat = os.stat(full_path)
+        self.date_time = time.localtime(stat.st_mtime)[:6]
+        self.external_attr = (stat.st_mode & 0xFFFF) << 16
+        self.payload = tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE)
+        deflater = Deflater(level)
+        try:
+            with open(full_path, 'rb') as source:
+                for chunk in deflater.chunks(source):
+                    self.payload.write(chunk)
+        except BaseException:
+            self.payload.close()
+            raise
+        self.crc = deflater.crc
+        self.file_size = deflater.size
+        self.payload.seek(0)
+
+    def chunks(self) -> Iterator[bytes]:
+        with self.payload:
+            yield from iter(lambda: self.payload.read(CHUNK_SIZE), b'')
+
+
+def deflate_files(
+    entries: Iterable[Tuple[str, str]], max_workers: Optional[int] = None
+) -> Iterator[Tuple[str, DeflatedFile]]:
+    """
+    Compresses (full_path, arcname) entries on the shared pool and yields (arcname, DeflatedFile)
+    in their original order. zlib releases the GIL while deflating, so members are compressed
+    on several cores at once; at most two members per worker are pending at any time.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    pool = compression_pool(max_workers)
+    pending = deque()
+    try:
+        for full_path, arcname in entries:
+            pending.append((arcname, pool.submit(DeflatedFile, full_path)))
+            if len(pending) >= 2 * max_workers:
+                arcname, future = pending.popleft()
+                yield arcname, future.result()
+        while pending:
+            arcname, future = pending.popleft()
+            yield arcname, future.result()
+    finally:
+        for arcname, future in pending:
+            if not future.cancel() and future.exception() is None:
+                future.result().payload.close()
+
+
+def write_files(
+    writer: ZipWriter, entries: Iterable[Tuple[str, str]], max_workers: Optional[int] = None
+) -> Iterator[bytes]:
+    """Adds (full_path, arcname) entries to `writer`, compressing them in parallel, and yields the bytes written."""
+    for arcname, deflated in deflate_files(entries, max_workers=max_workers):
+        yield from writer.add_raw(
+            arcname,
+            deflated.date_time,
+            deflated.external_attr,
+            ZIP_DEFLATED,
+            deflated.crc,
+            deflated.file_size,
+            deflated.chunks(),
+        )
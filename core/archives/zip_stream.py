@@ -0,0 +1,31 @@
+import os
+from typing import Iterable, Iterator, List, Tuple
+
+from core.archives.zip_writer import ZipWriter
+
+
+def walk_files(root: str, arcroot: str = "") -> List[Tuple[str, str]]:
+    """
+    Lists every file below `root` as (full_path, arcname) pairs, with arcnames
+    relative to `root` and prefixed by `arcroot`.
+    """
+    entries = []
+    for subdir, dirs, files in os.walk(root):
+        dirs.sort()
+        for file in sorted(files):
+            full_path = os.path.join(subdir, file)
+            relative_path = os.path.relpath(full_path, root)
+            entries.append((full_path, os.path.join(arcroot, relative_path)))
+    return entries
+
+
+def stream_zip(entries: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+    """
+    Yields a ZIP archive of the given (full_path, arcname) entries chunk by chunk, without
+    building the archive on disk first. Members are deflated one after another in the
+    calling thread, so a download holds about one chunk in memory whatever its size.
+    """
+    writer = ZipWriter()
+    for full_path, arcname in entries:
+        yield from writer.add_file(full_path, arcname)
+    yield from writer.finish()
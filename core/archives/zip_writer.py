@@ -0,0 +1,246 @@
+import os
+import struct
+import time
+import zlib
+from typing import Iterable, Iterator, List, Optional, Tuple
+from zipfile import ZIP64_LIMIT, ZIP_DEFLATED, ZIP_FILECOUNT_LIMIT, LargeZipFile, ZipInfo
+
+CHUNK_SIZE = 1024 * 1024
+
+_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+_LOCAL_HEADER_SIGNATURE = 0x04034B50
+_DATA_DESCRIPTOR = struct.Struct('<IIII')
+_DATA_DESCRIPTOR64 = struct.Struct('<IIQQ')
+_DATA_DESCRIPTOR_SIGNATURE = 0x08074B50
+_CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+_CENTRAL_HEADER_SIGNATURE = 0x02014B50
+_END_RECORD = struct.Struct('<IHHHHIIH')
+_END_RECORD_SIGNATURE = 0x06054B50
+_END_RECORD64 = struct.Struct('<IQHHIIQQQQ')
+_END_RECORD64_SIGNATURE = 0x06064B50
+_END_LOCATOR64 = struct.Struct('<IIQI')
+_END_LOCATOR64_SIGNATURE = 0x07064B50
+_ZIP64_EXTRA_ID = 0x0001
+
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_VERSION_DEFLATED = 20
+_VERSION_ZIP64 = 45
+_MADE_BY_UNIX = 3
+
+
+class Deflater:
+    """Raw deflate of a file object, chunk by chunk, keeping the CRC and size of what it read."""
+
+    def __init__(self, level: int = zlib.Z_DEFAULT_COMPRESSION):
+        self.crc = 0
+        self.size = 0
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    def chunks(self, source) -> Iterator[bytes]:
+        for data in iter(lambda: source.read(CHUNK_SIZE), b''):
+            self.crc = zlib.crc32(data, self.crc)
+            self.size += len(data)
+            compressed = self._compressor.compress(data)
+            if compressed:
+                yield compressed
+        yield self._compressor.flush()
+
+
+def raw_member_chunks(fileobj, info: ZipInfo) -> Iterator[bytes]:
+    """Compressed payload of a member of the archive open as fileobj, read without decompressing it."""
+    fileobj.seek(info.header_offset)
+    header = _LOCAL_HEADER.unpack(fileobj.read(_LOCAL_HEADER.size))
+    name_length, extra_length = header[-2:]
+    fileobj.seek(info.header_offset + _LOCAL_HEADER.size + name_length + extra_length)
+    remaining = info.compress_size
+    while remaining > 0:
+        data = fileobj.read(min(CHUNK_SIZE, remaining))
+        if not data:
+            raise EOFError(f'{info.filename} is truncated')
+        remaining -= len(data)
+        yield data
+
+
+def _dos_date_time(date_time: Tuple[int, ...]) -> Tuple[int, int]:
+    year, month, day, hour, minute, second = date_time[:6]
+    if year < 1980:
+        year, month, day, hour, minute, second = 1980, 1, 1, 0, 0, 0
+    return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+
+class _Member:
+    def __init__(self, arcname, date_time, external_attr, compress_type, file_size, crc=0):
+        self.arcname = arcname
+        self.date_time = date_time
+        self.external_attr = external_attr
+        self.compress_type = compress_type
+        self.file_size = file_size
+        self.compress_size = 0
+        self.crc = crc
+        self.offset = 0
+        # Deflate may grow incompressible data a little, hence the same margin as zipfile
+        self.zip64 = file_size * 1.05 > ZIP64_LIMIT
+        try:
+            self.name = arcname.encode('ascii')
+            self.flags = _FLAG_DATA_DESCRIPTOR
+        except UnicodeEncodeError:
+            self.name = arcname.encode('utf-8')
+            self.flags = _FLAG_DATA_DESCRIPTOR | _FLAG_UTF8
+
+    @property
+    def version(self) -> int:
+        return _VERSION_ZIP64 if self.zip64 else _VERSION_DEFLATED
+
+    def local_header(self) -> bytes:
+        # CRC and sizes follow the data in a descriptor; a zip64 extra announces 8-byte sizes there
+        extra = struct.pack('<HHQQ', _ZIP64_EXTRA_ID, 16, 0, 0) if self.zip64 else b''
+        sizes = 0xFFFFFFFF if self.zip64 else 0
+        dos_date, dos_time = _dos_date_time(self.date_time)
+        return (
+            _LOCAL_HEADER.pack(
+                _LOCAL_HEADER_SIGNATURE,
+                self.version,
+                self.flags,
+                self.compress_type,
+                dos_time,
+                dos_date,
+                0,
+                sizes,
+                sizes,
+                len(self.name),
+                len(extra),
+            )
+            + self.name
+            + extra
+        )
+
+    def data_descriptor(self) -> bytes:
+        if self.zip64:
+            return _DATA_DESCRIPTOR64.pack(_DATA_DESCRIPTOR_SIGNATURE, self.crc, self.compress_size, self.file_size)
+        if self.compress_size > ZIP64_LIMIT or self.file_size > ZIP64_LIMIT:
+            raise LargeZipFile(f'{self.arcname} grew past the ZIP64 limit while it was being written')
+        return _DATA_DESCRIPTOR.pack(_DATA_DESCRIPTOR_SIGNATURE, self.crc, self.compress_size, self.file_size)
+
+    def central_header(self) -> bytes:
+        file_size, compress_size, offset = self.file_size, self.compress_size, self.offset
+        extra_values = []
+        if file_size > ZIP64_LIMIT or compress_size > ZIP64_LIMIT:
+            extra_values += [file_size, compress_size]
+            file_size = compress_size = 0xFFFFFFFF
+        if offset > ZIP64_LIMIT:
+            extra_values.append(offset)
+            offset = 0xFFFFFFFF
+        extra = b''
+        if extra_values:
+            extra = struct.pack(f'<HH{len(extra_values)}Q', _ZIP64_EXTRA_ID, 8 * len(extra_values), *extra_values)
+        version = _VERSION_ZIP64 if extra_values else self.version
+        dos_date, dos_time = _dos_date_time(self.date_time)
+        return (
+            _CENTRAL_HEADER.pack(
+                _CENTRAL_HEADER_SIGNATURE,
+                _MADE_BY_UNIX << 8 | version,
+                version,
+                self.flags,
+                self.compress_type,
+                dos_time,
+                dos_date,
+                self.crc,
+                compress_size,
+                file_size,
+                len(self.name),
+                len(extra),
+                0,
+                0,
+                0,
+                self.external_attr,
+                offset,
+            )
+            + self.name
+            + extra
+        )
+
+
+class ZipWriter:
+    """
+    Produces a ZIP archive as a sequence of byte chunks, member after member, never seeking back:
+    the CRC and sizes of each member follow its data in a data descriptor, and the central
+    directory comes last. Only the directory entries are kept in memory, so the archive can go
+    straight to a response or an unseekable file.
+    """
+
+    def __init__(self):
+        self._members: List[_Member] = []
+        self._offset = 0
+
+    def add_file(self, full_path: str, arcname: str, level: int = zlib.Z_DEFAULT_COMPRESSION) -> Iterator[bytes]:
+        """Deflates the file at full_path into the archive one chunk at a time."""
+        stat = os.stat(full_path)
+        member = _Member(arcname, time.localtime(stat.st_mtime)[:6], (stat.st_mode & 0xFFFF) << 16, ZIP_DEFLATED, 0)
+        member.zip64 = stat.st_size * 1.05 > ZIP64_LIMIT
+        deflater = Deflater(level)
+        with open(full_path, 'rb') as source:
+            yield from self._write(member, deflater.chunks(source), deflater)
+
+    def add_raw(
+        self,
+        arcname: str,
+        date_time: Tuple[int, ...],
+        external_attr: int,
+        compress_type: int,
+        crc: int,
+        file_size: int,
+        chunks: Iterable[bytes],
+    ) -> Iterator[bytes]:
+        """Adds a member whose payload is already compressed, copying chunks as they are."""
+        member = _Member(arcname, date_time, external_attr, compress_type, file_size, crc)
+        yield from self._write(member, chunks)
+
+    def finish(self) -> Iterator[bytes]:
+        """The central directory and end records, after which the archive is complete."""
+        directory_offset = self._offset
+        directory = b''.join(member.central_header() for member in self._members)
+        count = len(self._members)
+        yield directory
+        if count > ZIP_FILECOUNT_LIMIT or directory_offset > ZIP64_LIMIT or len(directory) > ZIP64_LIMIT:
+            end64_offset = directory_offset + len(directory)
+            yield _END_RECORD64.pack(
+                _END_RECORD64_SIGNATURE,
+                _END_RECORD64.size - 12,
+                _MADE_BY_UNIX << 8 | _VERSION_ZIP64,
+                _VERSION_ZIP64,
+                0,
+                0,
+                count,
+                count,
+                len(directory),
+                directory_offset,
+            )
+            yield _END_LOCATOR64.pack(_END_LOCATOR64_SIGNATURE, 0, end64_offset, 1)
+        yield _END_RECORD.pack(
+            _END_RECORD_SIGNATURE,
+            0,
+            0,
+            min(count, 0xFFFF),
+            min(count, 0xFFFF),
+            min(len(directory), 0xFFFFFFFF),
+            min(directory_offset, 0xFFFFFFFF),
+            0,
+        )
+
+    def _write(self, member: _Member, chunks: Iterable[bytes], deflater: Optional[Deflater] = None):
+        member.offset = self._offset
+        header = member.local_header()
+        self._offset += len(header)
+        yield header
+        for chunk in chunks:
+            if chunk:
+                member.compress_size += len(chunk)
+                self._offset += len(chunk)
+                yield chunk
+        if deflater is not None:
+            member.crc, member.file_size = deflater.crc, deflater.size
+        descriptor = member.data_descriptor()
+        self._offset += len(descriptor)
+        yield descriptor
+        self._members.append(member)
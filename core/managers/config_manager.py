@@ -1,6 +1,8 @@
 import os
 import secrets
 
+from core.configuration.configuration import uploads_folder_name
+
 
 class ConfigManager:
     def __init__(self, app):
@@ -33,6 +35,26 @@ class Config:
     TIMEZONE = 'Europe/Madrid'
     TEMPLATES_AUTO_RELOAD = True
     UPLOAD_FOLDER = 'uploads'
+    ARCHIVE_CACHE_DIR = os.path.abspath(os.path.join(os.getenv('WORKING_DIR', ''), uploads_folder_name(), 'archives'))
+    ARCHIVE_CACHE_MAX_BYTES = int(os.getenv('ARCHIVE_CACHE_MAX_BYTES', 1024**3))
+    ARCHIVE_COMPRESSION_WORKERS = int(os.getenv('ARCHIVE_COMPRESSION_WORKERS', os.cpu_count() or 1))
+    BULK_ARCHIVE_PATH = os.path.abspath(
+        os.path.join(os.getenv('WORKING_DIR', ''), uploads_folder_name(), 'bulk', 'all_datasets.zip')
+    )
+    X_ACCEL_REDIRECT = os.getenv('X_ACCEL_REDIRECT', 'False').lower() in ('true', '1', 'yes')
+    X_ACCEL_REDIRECT_ROOT = os.path.abspath(os.path.join(os.getenv('WORKING_DIR', ''), uploads_folder_name()))
+    X_ACCEL_REDIRECT_LOCATION = os.getenv('X_ACCEL_REDIRECT_LOCATION', '/internal/uploads/')
+    TRACKING_ASYNC = os.getenv('TRACKING_ASYNC', 'True').lower() in ('true', '1', 'yes')
+    TRACKING_FLUSH_INTERVAL = float(os.getenv('TRACKING_FLUSH_INTERVAL', 2.0))
+    TRACKING_BATCH_SIZE = int(os.getenv('TRACKING_BATCH_SIZE', 500))
+    TRACKING_MAX_QUEUE = int(os.getenv('TRACKING_MAX_QUEUE', 100000))
+    TRACKING_MAX_RETRIES = int(os.getenv('TRACKING_MAX_RETRIES', 5))
+    STATISTICS_CACHE_TTL = float(os.getenv('STATISTICS_CACHE_TTL', 10))
+    STATISTICS_VISITOR_SKETCHES = os.getenv('STATISTICS_VISITOR_SKETCHES', 'False').lower() in ('true', '1', 'yes')
+    STATISTICS_RECORD_RETENTION_DAYS = int(os.getenv('STATISTICS_RECORD_RETENTION_DAYS', 0))
+    EXPLORE_CACHE_TTL = float(os.getenv('EXPLORE_CACHE_TTL', 60))
+    EXPLORE_CACHE_MAX_ENTRIES = int(os.getenv('EXPLORE_CACHE_MAX_ENTRIES', 512))
+    EXPLORE_SUGGEST_REFRESH_INTERVAL = float(os.getenv('EXPLORE_SUGGEST_REFRESH_INTERVAL', 30))
 
 
 class DevelopmentConfig(Config):
@@ -49,6 +71,10 @@ class TestingConfig(Config):
         f"{os.getenv('MARIADB_TEST_DATABASE', 'default_db')}"
     )
     WTF_CSRF_ENABLED = False
+    TRACKING_ASYNC = False
+    STATISTICS_CACHE_TTL = 0
+    EXPLORE_CACHE_TTL = 0
+    EXPLORE_SUGGEST_REFRESH_INTERVAL = 0
 
 
 class ProductionConfig(Config):
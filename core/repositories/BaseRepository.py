@@ -1,5 +1,8 @@
 from typing import Generic, List, NoReturn, Optional, TypeVar, Union
 
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+
 import app
 
 T = TypeVar('T')
@@ -19,6 +22,28 @@ class BaseRepository(Generic[T]):
             self.session.flush()
         return instance
 
+    def record_once(self, commit: bool = True, **kwargs) -> bool:
+        """Inserts a row in a single statement, unless it would break a unique constraint."""
+        return self.record_many_once([kwargs], commit=commit) == 1
+
+    def record_many_once(self, rows: List[dict], commit: bool = True) -> int:
+        """Multi-row variant of record_once. Returns how many rows were actually inserted."""
+        if not rows:
+            return 0
+        dialect = self.session.get_bind().dialect.name
+        if dialect in ('mysql', 'mariadb'):
+            statement = insert(self.model).values(rows).prefix_with('IGNORE')
+        elif dialect == 'sqlite':
+            statement = sqlite.insert(self.model).values(rows).on_conflict_do_nothing()
+        elif dialect == 'postgresql':
+            statement = postgresql.insert(self.model).values(rows).on_conflict_do_nothing()
+        else:
+            statement = insert(self.model).values(rows)
+        inserted = self.session.execute(statement).rowcount
+        if commit:
+            self.session.commit()
+        return inserted
+
     def get_by_id(self, id: int) -> Optional[T]:
         instance: Optional[T] = self.model.query.get(id)
         return instance
@@ -1,8 +1,9 @@
-from flask import request
+from flask import current_app, request
 from flask_restful import Resource
 from datetime import datetime
 
 from app import db
+from core.responses.ndjson_responses import STREAM_BATCH_SIZE, ndjson_response, wants_ndjson
 
 
 def convert_value(value):
@@ -11,21 +12,52 @@ def convert_value(value):
     return value
 
 
+def output_json(data, code, headers=None):
+    """Flask-RESTful representation encoding with the application JSON provider instead of the json module."""
+    response = current_app.json.response(data)
+    response.status_code = code
+    response.headers.extend(headers or {})
+    return response
+
+
 class GenericResource(Resource):
-    def __init__(self, model, serializer):
+    def __init__(self, model, serializer, options=None):
         self.model = model
         self.model_name = model.__name__
         self.serializer = serializer
+        # Callable returning loader options for reads, so serializing related objects does not query row by row
+        self.options = options
+
+    def query(self):
+        return self.model.query.options(*self.options()) if self.options else self.model.query
+
+    def stream(self, batch_size: int):
+        """
+        Every item in primary key order, fetched in keyset pages of batch_size. Pages are read in
+        full on a regular cursor, so the loader queries of one page cannot cut the listing short.
+        """
+        mapper = self.model.__mapper__
+        key = getattr(self.model, mapper.get_property_by_column(mapper.primary_key[0]).key)
+        last = None
+        while True:
+            page = self.query() if last is None else self.query().filter(key > last)
+            items = page.order_by(key).limit(batch_size).all()
+            yield from items
+            if len(items) < batch_size:
+                return
+            last = getattr(items[-1], key.key)
 
     def get(self, id=None):
         if id:
-            item = self.model.query.get(id)
+            item = self.query().get(id)
             if not item:
                 return {'message': f'{self.model_name} not found'}, 404
             return self.serializer.serialize(item), 200
+        elif wants_ndjson():
+            return ndjson_response(self.stream(STREAM_BATCH_SIZE), self.serializer.serialize)
         else:
-            items = self.model.query.all()
-            return {'items': [self.serializer.serialize(i) for i in items]}, 200
+            items = self.query().all()
+            return {'items': self.serializer.serialize_many(items)}, 200
 
     def post(self):
         data = request.get_json()
@@ -62,9 +94,9 @@ class GenericResource(Resource):
         return {'message': f'{self.model_name} deleted successfully'}, 204
 
 
-def create_resource(model, serialization_fields=None):
+def create_resource(model, serialization_fields=None, options=None):
     class Resource(GenericResource):
         def __init__(self):
-            super().__init__(model, serialization_fields)
+            super().__init__(model, serialization_fields, options)
 
     return Resource
@@ -0,0 +1,102 @@
+import mimetypes
+import os
+import unicodedata
+from urllib.parse import quote
+
+import flask
+from flask import Response, current_app, request
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+
+def _internal_uri(path: str):
+    """Maps an absolute path below X_ACCEL_REDIRECT_ROOT to the nginx internal location serving it."""
+    root = os.path.abspath(current_app.config['X_ACCEL_REDIRECT_ROOT'])
+    relative_path = os.path.relpath(os.path.abspath(path), root)
+    if relative_path.startswith(os.pardir):
+        return None
+    return current_app.config['X_ACCEL_REDIRECT_LOCATION'].rstrip('/') + '/' + quote(relative_path)
+
+
+def _content_disposition(response: Response, as_attachment: bool, download_name: str):
+    try:
+        download_name.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        names = {'filename': simple, 'filename*': f"UTF-8''{quote(download_name, safe='!#$&+^`|~')}"}
+    else:
+        names = {'filename': download_name}
+    response.headers.set('Content-Disposition', 'attachment' if as_attachment else 'inline', **names)
+
+
+def send_file(
+    path_or_file,
+    mimetype=None,
+    as_attachment=False,
+    download_name=None,
+    conditional=True,
+    etag=True,
+    last_modified=None,
+    max_age=None,
+    **kwargs,
+) -> Response:
+    """
+    Drop-in replacement for flask.send_file. When X_ACCEL_REDIRECT is enabled and the file
+    lives below X_ACCEL_REDIRECT_ROOT, the response carries no body: nginx picks up the
+    X-Accel-Redirect header and streams the file itself, so the worker is freed at once.
+    Caching headers and conditional requests are handled the same way in both modes.
+    """
+    internal_uri = None
+    if current_app.config.get('X_ACCEL_REDIRECT') and isinstance(path_or_file, (str, os.PathLike)):
+        path_or_file = os.path.join(current_app.root_path, path_or_file)
+        internal_uri = _internal_uri(path_or_file)
+
+    if internal_uri is None:
+        return flask.send_file(
+            path_or_file,
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            conditional=conditional,
+            etag=etag,
+            last_modified=last_modified,
+            max_age=max_age,
+            **kwargs,
+        )
+
+    if not os.path.isfile(path_or_file):
+        raise NotFound()
+
+    download_name = download_name or os.path.basename(path_or_file)
+    if mimetype is None:
+        mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+
+    response = Response(mimetype=mimetype)
+    response.headers['X-Accel-Redirect'] = internal_uri
+    _content_disposition(response, as_attachment, download_name)
+
+    response.last_modified = last_modified or os.path.getmtime(path_or_file)
+    response.cache_control.no_cache = True
+    if max_age is not None:
+        if max_age > 0:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    if isinstance(etag, str):
+        response.set_etag(etag)
+
+    if conditional:
+        response = response.make_conditional(request)
+        # nginx would otherwise send the file along with the 304
+        if response.status_code == 304:
+            response.headers.pop('X-Accel-Redirect', None)
+
+    return response
+
+
+def send_from_directory(directory, path, **kwargs) -> Response:
+    """Drop-in replacement for flask.send_from_directory that honours X_ACCEL_REDIRECT."""
+    file_path = safe_join(os.fspath(directory), os.fspath(path))
+    if file_path is None:
+        raise NotFound()
+    return send_file(file_path, **kwargs)
@@ -0,0 +1,25 @@
+from typing import Callable, Iterable
+
+from flask import Response, current_app, request, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Rows fetched per keyset page while a listing streams
+STREAM_BATCH_SIZE = 100
+
+
+def wants_ndjson() -> bool:
+    """Whether the client prefers one JSON document per line to a single JSON document."""
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def ndjson_response(items: Iterable, serialize: Callable) -> Response:
+    """
+    Streams every item serialized on its own line, as items are read. Only the batch being
+    serialized is in memory, and clients can start working before the last line arrives.
+    """
+
+    def lines():
+        for item in items:
+            yield current_app.json.dumps(serialize(item)) + '\n'
+
+    return Response(stream_with_context(lines()), mimetype=NDJSON_MIMETYPE)
@@ -0,0 +1,64 @@
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Hashable, Iterable, List, Tuple
+
+
+class PrefixIndex:
+    """
+    In-memory autocompletion over (kind, value) entries. Every word start of a value is kept in
+    one sorted list, so a lookup is a binary search plus a short forward scan whatever the size.
+    Entries belong to owners (e.g. datasets) and are replaced owner by owner, and a value is
+    suggested for as long as at least one owner has it, ranked by how many do.
+    """
+
+    def __init__(self, normalize: Callable[[str], str] = str.lower):
+        self.normalize = normalize
+        self._keys: List[Tuple[str, str, str]] = []
+        self._owners: Dict[Tuple[str, str], int] = Counter()
+        self._entries: Dict[Hashable, List[Tuple[str, str]]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    def replace(self, owner: Hashable, entries: Iterable[Tuple[str, str]]):
+        """Sets the (kind, value) entries of an owner, dropping the ones it had before."""
+        entries = list(dict.fromkeys((kind, value) for kind, value in entries if value))
+        with self._lock:
+            for entry in self._entries.pop(owner, []):
+                self._owners[entry] -= 1
+                if not self._owners[entry]:
+                    del self._owners[entry]
+                    for key in self._word_starts(*entry):
+                        del self._keys[bisect_left(self._keys, key)]
+            for entry in entries:
+                if not self._owners[entry]:
+                    for key in self._word_starts(*entry):
+                        insort(self._keys, key)
+                self._owners[entry] += 1
+            if entries:
+                self._entries[owner] = entries
+
+    def search(self, prefix: str, limit: int = 10, scan: int = 1000) -> List[Tuple[str, str, int]]:
+        """
+        Up to limit (kind, value, owners) entries with a word starting with prefix, most owned
+        first. Only the first scan matching keys are looked at, which bounds very short prefixes.
+        """
+        prefix = self.normalize(prefix).strip()
+        if not prefix:
+            return []
+        found = set()
+        with self._lock:
+            position = bisect_left(self._keys, (prefix,))
+            for key, kind, value in self._keys[position : position + scan]:
+                if not key.startswith(prefix):
+                    break
+                found.add((kind, value))
+            ranked = [(kind, value, self._owners[(kind, value)]) for kind, value in found]
+        ranked.sort(key=lambda entry: (-entry[2], entry[1], entry[0]))
+        return ranked[:limit]
+
+    def _word_starts(self, kind: str, value: str) -> List[Tuple[str, str, str]]:
+        words = self.normalize(value).split()
+        return list(dict.fromkeys((' '.join(words[start:]), kind, value) for start in range(len(words))))
@@ -0,0 +1,14 @@
+from typing import Set
+
+
+def trigrams(word: str) -> Set[str]:
+    """Three-letter slices of a word padded like pg_trgm does, so that word boundaries count too."""
+    padded = f'  {word} '
+    return {padded[start : start + 3] for start in range(len(padded) - 2)}
+
+
+def similarity(first: str, second: str) -> float:
+    """Share of trigrams two words have in common, from 0 (none) to 1 (same trigrams)."""
+    first_trigrams, second_trigrams = trigrams(first), trigrams(second)
+    shared = len(first_trigrams & second_trigrams)
+    return shared / (len(first_trigrams) + len(second_trigrams) - shared)
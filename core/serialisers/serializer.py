@@ -1,4 +1,9 @@
 from datetime import datetime
+from operator import attrgetter
+
+from sqlalchemy import DateTime
+from sqlalchemy.orm import ColumnProperty, class_mapper
+from sqlalchemy.orm.exc import UnmappedClassError
 
 
 def convert_value(value):
@@ -7,25 +12,101 @@ def convert_value(value):
     return value
 
 
+def _isoformat(getter):
+    def get(instance):
+        value = getter(instance)
+        return value.isoformat() if value is not None else None
+
+    return get
+
+
+def _call(attr_name):
+    def get(instance):
+        return convert_value(getattr(instance, attr_name)())
+
+    return get
+
+
+def _lookup(attr_name):
+    def get(instance):
+        attr = getattr(instance, attr_name, None)
+        if callable(attr):
+            attr = attr()
+        return convert_value(attr)
+
+    return get
+
+
+def _column_types(cls) -> dict:
+    """Column attribute name -> SQLAlchemy type of a mapped class, empty for plain classes."""
+    try:
+        mapper = class_mapper(cls)
+    except UnmappedClassError:
+        return {}
+    return {
+        prop.key: prop.columns[0].type
+        for prop in mapper.iterate_properties
+        if isinstance(prop, ColumnProperty) and len(prop.columns) == 1
+    }
+
+
 class Serializer:
+    """
+    Turns instances into dicts of serialization_fields (key -> attribute or method name), using
+    related_serializers for the fields whose method returns related instances. How each field is
+    read is worked out once per class, the first time one of its instances is serialized.
+    """
+
     def __init__(self, serialization_fields, related_serializers=None):
         self.serialization_fields = serialization_fields
         self.related_serializers = related_serializers or {}
+        self._plans = {}
 
     def serialize(self, instance):
-        serialized_data = {}
+        return {key: get(instance) for key, get in self._plan(type(instance))}
+
+    def serialize_many(self, instances):
+        """serialize() of each instance, compiling the plan of their class once."""
+        if not instances:
+            return []
+        plan = self._plan(type(instances[0]))
+        if any(type(instance) is not type(instances[0]) for instance in instances):
+            return [self.serialize(instance) for instance in instances]
+        return [{key: get(instance) for key, get in plan} for instance in instances]
+
+    def _plan(self, cls):
+        plan = self._plans.get(cls)
+        if plan is None:
+            plan = self._plans[cls] = self._compile(cls)
+        return plan
+
+    def _compile(self, cls):
+        """(key, accessor) of every field, each accessor taking an instance of cls."""
+        column_types = _column_types(cls)
+        plan = []
         for key, attr_name in self.serialization_fields.items():
             if key in self.related_serializers:
-                related_data = getattr(instance, attr_name)()
-                if isinstance(related_data, list):
-                    serialized_data[key] = [
-                        self.related_serializers[key].serialize(sub_instance) for sub_instance in related_data
-                    ]
-                else:
-                    serialized_data[key] = self.related_serializers[key].serialize(related_data)
+                plan.append((key, self._related(attr_name, self.related_serializers[key])))
+            elif attr_name in column_types:
+                getter = attrgetter(attr_name)
+                column_type = column_types[attr_name]
+                is_datetime = isinstance(column_type, DateTime) or isinstance(
+                    getattr(column_type, 'impl', None), DateTime
+                )
+                plan.append((key, _isoformat(getter) if is_datetime else getter))
+            elif callable(getattr(cls, attr_name, None)):
+                plan.append((key, _call(attr_name)))
             else:
-                attr = getattr(instance, attr_name, None)
-                if callable(attr):
-                    attr = attr()
-                serialized_data[key] = convert_value(attr)
-        return serialized_data
+                # Properties, instance attributes and anything else whose kind depends on the instance
+                plan.append((key, _lookup(attr_name)))
+        return plan
+
+    @staticmethod
+    def _related(attr_name, serializer):
+        def get(instance):
+            related_data = getattr(instance, attr_name)()
+            if isinstance(related_data, list):
+                return serializer.serialize_many(related_data)
+            return serializer.serialize(related_data)
+
+        return get
@@ -0,0 +1,54 @@
+import hashlib
+import math
+from typing import Iterable
+
+
+class HyperLogLog:
+    """
+    Cardinality sketch: counts distinct values in 2**precision bytes with a standard error of
+    about 1.04 / sqrt(2**precision), 1.6% at the default precision. Sketches of the same
+    precision can be merged, so daily sketches add up to any date range.
+    """
+
+    def __init__(self, precision: int = 12, registers: bytes = None):
+        if not 4 <= precision <= 16:
+            raise ValueError('precision must be between 4 and 16')
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError(f'expected {self.size} registers, got {len(self.registers)}')
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        return cls(precision=len(data).bit_length() - 1, registers=data)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+    def add(self, value: str):
+        hashed = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+        index = hashed >> (64 - self.precision)
+        remainder_bits = 64 - self.precision
+        remainder = hashed & ((1 << remainder_bits) - 1)
+        rank = remainder_bits - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[str]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'HyperLogLog'):
+        if other.precision != self.precision:
+            raise ValueError('cannot merge sketches of different precision')
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(self.size, 0.7213 / (1 + 1.079 / self.size))
+        estimate = alpha * self.size * self.size / sum(2.0**-register for register in self.registers)
+        zeros = self.registers.count(0)
+        # Linear counting is more accurate while most registers are still empty
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+        return round(estimate)
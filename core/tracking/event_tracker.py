@@ -0,0 +1,166 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from core.repositories.BaseRepository import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+
+class EventTracker:
+    """
+    Write-behind buffer for view and download records. Requests only enqueue the record;
+    a background thread flushes the queue every TRACKING_FLUSH_INTERVAL seconds, or as soon
+    as TRACKING_BATCH_SIZE events are waiting, with one multi-row insert-ignore per table.
+    A batch that fails (a deadlock, the database going away) goes back to the front of the
+    queue for the next flush, up to TRACKING_MAX_RETRIES times. With TRACKING_ASYNC disabled
+    every event is written straight away.
+    """
+
+    def __init__(self, app=None, db=None):
+        self.app = None
+        self.db = None
+        self.asynchronous = False
+        self.flush_interval = 2.0
+        self.batch_size = 500
+        self.max_queue = 100000
+        self.max_retries = 5
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._enqueued = 0
+        self._written = 0
+        self._duplicates = 0
+        self._dropped = 0
+        self._failed = 0
+        self._retried = 0
+        self._last_flush = None
+        self._listeners = []
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.app = app
+        self.db = db
+        self.asynchronous = app.config.get('TRACKING_ASYNC', False)
+        self.flush_interval = app.config.get('TRACKING_FLUSH_INTERVAL', self.flush_interval)
+        self.batch_size = app.config.get('TRACKING_BATCH_SIZE', self.batch_size)
+        self.max_queue = app.config.get('TRACKING_MAX_QUEUE', self.max_queue)
+        self.max_retries = app.config.get('TRACKING_MAX_RETRIES', self.max_retries)
+        if self.asynchronous:
+            atexit.register(self.flush)
+
+    def on_recorded(self, listener):
+        """
+        Registers listener(model, rows, inserted), called inside the transaction that inserts the
+        records. rows are all the records tracked, inserted how many of them were new.
+        """
+        self._listeners.append(listener)
+
+    def track(self, model, **values):
+        """
+        Records a row of model; rows colliding with one of its unique constraints are skipped.
+        """
+        event = (model, values)
+        if not self.asynchronous:
+            self._write([event])
+            return
+
+        self._ensure_worker()
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self._dropped += 1
+                return
+            self._queue.append((event, 0))
+            self._enqueued += 1
+            if len(self._queue) >= self.batch_size:
+                self._wakeup.notify()
+
+    def flush(self):
+        """
+        Writes every queued event. Safe to call from any thread. Stops at the first batch that
+        fails, which is requeued and tried again by the next flush.
+        """
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if not batch:
+                    return
+                with self.app.app_context():
+                    try:
+                        self._write([event for event, attempts in batch])
+                    except Exception as exc:
+                        self.db.session.rollback()
+                        self._requeue(batch, exc)
+                        return
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'queue_depth': len(self._queue),
+                'max_queue': self.max_queue,
+                'enqueued': self._enqueued,
+                'written': self._written,
+                'duplicates': self._duplicates,
+                'dropped': self._dropped,
+                'failed': self._failed,
+                'retried': self._retried,
+                'last_flush': self._last_flush,
+            }
+
+    def _requeue(self, batch, exc):
+        retried = [(event, attempts + 1) for event, attempts in batch if attempts < self.max_retries]
+        lost = len(batch) - len(retried)
+        with self._lock:
+            self._queue.extendleft(reversed(retried))
+            self._retried += len(retried)
+            self._failed += lost
+        if lost:
+            logger.error(f"Tracking flush lost {lost} events after {self.max_retries} retries: {exc}")
+        if retried:
+            logger.warning(f"Tracking flush failed, {len(retried)} events requeued: {exc}")
+
+    def _ensure_worker(self):
+        # The app is created before gunicorn forks, so each worker process starts its own thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='event-tracker', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if len(self._queue) < self.batch_size:
+                    self._wakeup.wait(self.flush_interval)
+            self.flush()
+
+    def _write(self, events):
+        rows_by_model = {}
+        for model, values in events:
+            rows_by_model.setdefault(model, []).append(values)
+
+        written = 0
+        # Tables, and the counter rows their listeners lock, always in the same order across workers
+        for model, rows in sorted(rows_by_model.items(), key=lambda item: item[0].__tablename__):
+            inserted = BaseRepository(model).record_many_once(rows, commit=False)
+            for listener in self._listeners:
+                listener(model, rows, inserted)
+            written += inserted
+        self.db.session.commit()
+
+        with self._lock:
+            self._written += written
+            self._duplicates += len(events) - written
+            self._last_flush = time.time()
+        logger.debug(f"Tracking flushed {written} events: {self.stats()}")
@@ -63,5 +63,8 @@ else
     flask db upgrade
 fi
 
+# Index existing datasets for the explore search; the search migrations only create the tables
+flask explore reindex
+
 # Start the Flask application with specified host and port, enabling reload and debug mode
 exec flask run --host=0.0.0.0 --port=5000 --reload --debug
@@ -51,6 +51,9 @@ else
     flask db upgrade
 fi
 
+# Index existing datasets for the explore search; the search migrations only create the tables
+flask explore reindex
+
 # Start the application using Gunicorn, binding it to port 80
 # Set the logging level to info and the timeout to 3600 seconds
 exec gunicorn --bind 0.0.0.0:80 app:app --log-level info --timeout 3600
@@ -0,0 +1,47 @@
+"""unique view and download records per user, target and cookie
+
+Revision ID: c4077876945a
+Revises: fe893c367baa
+Create Date: 2026-10-18 10:12:31.418206
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4077876945a'
+down_revision = 'fe893c367baa'
+branch_labels = None
+depends_on = None
+
+
+RECORD_TABLES = [
+    ('ds_download_record', 'dataset_id', 'download_cookie', 'uix_ds_download_once'),
+    ('ds_view_record', 'dataset_id', 'view_cookie', 'uix_ds_view_once'),
+    ('file_download_record', 'file_id', 'download_cookie', 'uix_file_download_once'),
+    ('file_view_record', 'file_id', 'view_cookie', 'uix_file_view_once'),
+]
+
+
+def upgrade():
+    for table, target, cookie, constraint in RECORD_TABLES:
+        # Keep the first record of every (user, target, cookie) left behind by concurrent requests
+        op.execute(
+            f'DELETE FROM {table} WHERE id NOT IN ('
+            f'SELECT id FROM (SELECT MIN(id) AS id FROM {table} '
+            f'GROUP BY COALESCE(user_id, 0), {target}, {cookie}) AS first_records)'
+        )
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(
+                sa.Column('user_key', sa.Integer(), sa.Computed('coalesce(user_id, 0)', persisted=True))
+            )
+            batch_op.create_unique_constraint(constraint, ['user_key', target, cookie])
+
+
+def downgrade():
+    for table, target, cookie, constraint in RECORD_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(constraint, type_='unique')
+            batch_op.drop_column('user_key')
@@ -19,6 +19,10 @@ from rosemary.commands.info import info, info2
 from rosemary.commands.make_module import make_module
 from rosemary.commands.env import env
 from rosemary.commands.test import test
+from rosemary.commands.benchmark import benchmark_serializer
+from rosemary.commands.explore_reindex import explore_reindex
+from rosemary.commands.bulk_archive import bulk_archive
+from rosemary.commands.statistics_rollup import statistics_rollup
 
 
 class RosemaryCLI(click.Group):
@@ -57,6 +61,10 @@ cli.add_command(compose_env)
 cli.add_command(locust)
 cli.add_command(stop)
 cli.add_command(selenium)
+cli.add_command(benchmark_serializer)
+cli.add_command(explore_reindex)
+cli.add_command(bulk_archive)
+cli.add_command(statistics_rollup)
 cli.add_command(module_list)
 
 
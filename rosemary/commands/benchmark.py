@@ -0,0 +1,35 @@
+import json
+import timeit
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.command('benchmark:serializer', help="Measures the per-dataset cost of the dataset API listing.")
+@click.option('--repeat', default=20, show_default=True, help="Timed runs per step; the fastest one is reported.")
+@with_appcontext
+def benchmark_serializer(repeat):
+    from app.modules.dataset.api import dataset_serializer
+    from app.modules.dataset.models import DataSet
+    from app.modules.dataset.repositories import dataset_graph_options
+
+    datasets = DataSet.query.options(*dataset_graph_options()).all()
+    if not datasets:
+        click.echo(click.style("There are no datasets to serialize, run 'rosemary db:seed' first.", fg='red'))
+        return
+
+    # The first run compiles the serializer plans and leaves every attribute loaded
+    listing = {'items': dataset_serializer.serialize_many(datasets)}
+    steps = {
+        'serialize': lambda: dataset_serializer.serialize_many(datasets),
+        'encode (json module)': lambda: json.dumps(listing),
+        'encode (app JSON provider)': lambda: current_app.json.dumps(listing),
+    }
+
+    click.echo(f"Serializing {len(datasets)} datasets, best of {repeat} runs")
+    click.echo(f"{'Step':<30} {'per dataset':>14}")
+    click.echo('-' * 45)
+    for name, step in steps.items():
+        best = min(timeit.repeat(step, number=1, repeat=repeat))
+        click.echo(f"{name:<30} {best / len(datasets) * 1e6:>11.2f} µs")
@@ -0,0 +1,11 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('dataset:bulk-archive', help="Refreshes the bulk ZIP snapshot served by /dataset/download/all.")
+@with_appcontext
+def bulk_archive():
+    from app.modules.dataset.services import DataSetService
+
+    path = DataSetService().refresh_bulk_archive()
+    click.echo(click.style(f"Bulk archive up to date at {path}.", fg='green'))
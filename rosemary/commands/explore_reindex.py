@@ -0,0 +1,11 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('explore:reindex', help="Rebuilds the explore search index and indexes the UVL files not parsed yet.")
+@with_appcontext
+def explore_reindex():
+    from app.modules.explore.services import reindex
+
+    extracted = reindex()
+    click.echo(click.style(f"Explore search index rebuilt, {extracted} new UVL files indexed.", fg='green'))
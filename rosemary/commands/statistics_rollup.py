@@ -0,0 +1,15 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command(
+    'statistics:rollup', help="Rolls closed days up into the daily statistics table and deletes expired records."
+)
+@with_appcontext
+def statistics_rollup():
+    from app.modules.statistics.services import DailyStatisticsService
+
+    rolled_up_until = DailyStatisticsService().roll_up()
+    for kind, day in rolled_up_until.items():
+        click.echo(f"{kind}: rolled up until {day.isoformat()}")
+    click.echo(click.style("Daily statistics up to date.", fg='green'))